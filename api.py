@@ -0,0 +1,268 @@
+"""Headless API: batch auto-labeling, export, class remap and stats without Streamlit.
+
+    from api import label_directory
+    label_directory("data/models/best.pt", ["car", "person"], conf_threshold=0.4, workers=4)
+
+Heavy dependencies (ultralytics/torch, cv2) are only imported once a
+function actually needs them.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from utils.annotation_store import AnnotationStore
+from utils.annotation_utils import AnnotationUtils
+from utils.autolabel_utils import AutoLabelUtils
+from utils.convert_utils import ConvertUtils
+from utils.dataset_manifest import DatasetManifest
+from utils.export_utils import ExportUtils
+from utils.file_utils import FileUtils
+from utils.prediction_cache import PredictionCache
+from utils.remap_utils import RemapUtils
+
+# Per-process state of labeling workers
+_worker_model = None
+
+
+# The dataset the stores (annotations.db, predictions.db, ...) belong to
+_DEFAULT_DIRS = (Config.UPLOADS_DIR, Config.ANNOTATIONS_DIR)
+
+
+def _point_config(images_dir: Optional[str], labels_dir: Optional[str]):
+    if images_dir:
+        Config.UPLOADS_DIR = Path(images_dir)
+    if labels_dir:
+        Config.ANNOTATIONS_DIR = Path(labels_dir)
+        Config.ANNOTATIONS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+@contextmanager
+def use_directories(images_dir: Optional[str] = None, labels_dir: Optional[str] = None) -> Iterator[bool]:
+    """Point Config at another dataset inside the block; yields True if it is the default dataset"""
+    saved = (Config.UPLOADS_DIR, Config.ANNOTATIONS_DIR)
+    try:
+        _point_config(images_dir, labels_dir)
+        current = (Config.UPLOADS_DIR, Config.ANNOTATIONS_DIR)
+        yield all(Path(a).resolve() == Path(b).resolve() for a, b in zip(current, _DEFAULT_DIRS))
+    finally:
+        Config.UPLOADS_DIR, Config.ANNOTATIONS_DIR = saved
+
+
+def _init_worker(model_path: str, images_dir, labels_dir, torch_threads: int):
+    global _worker_model
+    import torch
+    from models.yolo_model import YOLOModel
+
+    torch.set_num_threads(torch_threads)
+    # Worker processes stay on the dataset; in-process the caller's block restores Config
+    _point_config(images_dir, labels_dir)
+    _worker_model = YOLOModel(model_path)
+
+
+def _label_chunk(
+    image_paths: List[str], conf_threshold: float, batch_size: int, tiling: Dict
+) -> Tuple[List[str], List[Tuple[str, Optional[np.ndarray]]]]:
+    """Raw predictions of a chunk, plus the model's class names for the parent"""
+    results = list(_worker_model.predict_batch_raw(
+        image_paths, batch_size=batch_size, conf_threshold=conf_threshold, **tiling
+    ))
+    return _worker_model.names_list(), results
+
+
+def _run_chunks(chunks: List[List[str]], initargs: Tuple, workers: int, *chunk_args):
+    """Yield per-chunk results in order; a single worker runs in this process"""
+    if not chunks:
+        return
+    if workers == 1:
+        _init_worker(*initargs)
+        for chunk in chunks:
+            yield _label_chunk(chunk, *chunk_args)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        futures = [pool.submit(_label_chunk, chunk, *chunk_args) for chunk in chunks]
+        for future in futures:
+            yield future.result()
+
+
+def label_directory(
+    model_path: str,
+    class_names: List[str],
+    conf_threshold: float = 0.5,
+    images_dir: Optional[str] = None,
+    labels_dir: Optional[str] = None,
+    workers: int = 1,
+    batch_size: int = Config.AUTOLABEL_BATCH_SIZE,
+    resume: bool = True,
+    progress: Optional[Callable[[int, int], None]] = None,
+    tile_size: Optional[int] = None,
+    tile_overlap: float = Config.TILE_OVERLAP,
+    tile_batch_size: int = Config.TILE_BATCH_SIZE,
+    class_filter: Optional[List[str]] = None,
+) -> Dict:
+    """Auto-label every image in a directory, one model per worker process.
+
+    Finished images are checkpointed under the same job id the UI uses,
+    so an interrupted run (CLI or UI) resumes where it stopped. Setting
+    ``tile_size`` switches to tiled inference for high-resolution images.
+    On the default dataset raw predictions are cached like in the UI:
+    images already predicted by this model are re-thresholded without
+    starting any worker, and human boxes are kept.
+    """
+    from models.model_registry import ModelRegistry
+
+    with use_directories(images_dir, labels_dir) as default_dataset:
+        image_paths = FileUtils.get_image_paths()
+        model_hash = ModelRegistry().file_hash(model_path)
+        job_id = AutoLabelUtils.job_id(model_hash, class_names, conf_threshold, tile_size, tile_overlap, class_filter)
+        checkpoint_path = Config.JOBS_DIR / f"{job_id}.done"
+
+        done = set()
+        if resume and checkpoint_path.exists():
+            with open(checkpoint_path, "r") as f:
+                done = {line.rstrip("\n") for line in f if line.strip()}
+        remaining = [p for p in image_paths if p not in done]
+
+        store = None
+        if default_dataset:
+            # Index label files first: model boxes must not replace unindexed manual labels
+            store = AnnotationStore()
+            store.import_yolo_dir()
+        cache = PredictionCache() if default_dataset else None
+        model_key = PredictionCache.model_key(model_hash, tile_size, tile_overlap)
+        infer_conf = min(conf_threshold, Config.PREDICTION_CACHE_MIN_CONF)
+        model_names = cache.model_names(model_hash) if cache is not None else None
+        cached = cache.get_many(model_key, remaining, conf_threshold) if model_names else {}
+        misses = [p for p in remaining if p not in cached]
+
+        chunk_size = batch_size * 4
+        chunks = [misses[i:i + chunk_size] for i in range(0, len(misses), chunk_size)]
+        workers = max(1, workers)
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        failed = []
+        started = time.time()
+        completed = len(image_paths) - len(remaining)
+
+        tiling = {"tile_size": tile_size, "tile_overlap": tile_overlap, "tile_batch_size": tile_batch_size}
+        initargs = (model_path, images_dir, labels_dir, torch_threads)
+        cached_chunk = (model_names, list(cached.items()))
+        with open(checkpoint_path, "a") as checkpoint:
+            for names, chunk_results in chain(
+                [cached_chunk] if cached else [],
+                _run_chunks(chunks, initargs, workers, infer_conf, batch_size, tiling),
+            ):
+                class_lookup = AutoLabelUtils.class_lookup(names, class_names, class_filter)
+                for path, raw in chunk_results:
+                    if raw is None:
+                        failed.append(path)
+                    else:
+                        if cache is not None and path not in cached:
+                            cache.put(model_key, path, raw, infer_conf)
+                        AutoLabelUtils.materialize(path, raw, class_lookup, conf_threshold, store)
+                        checkpoint.write(f"{path}\n")
+                    completed += 1
+                checkpoint.flush()
+                if cache is not None and names != model_names:
+                    cache.put_model_names(model_hash, names)
+                    model_names = names
+                if progress is not None:
+                    progress(completed, len(image_paths))
+
+        checkpoint_path.unlink(missing_ok=True)
+        elapsed = time.time() - started
+        return {
+            "job_id": job_id,
+            "images": len(image_paths),
+            "labeled": len(remaining) - len(failed),
+            "from_cache": len(cached),
+            "skipped": len(image_paths) - len(remaining),
+            "failed": failed,
+            "seconds": elapsed,
+            "images_per_second": (len(remaining) / elapsed) if elapsed > 0 else 0.0,
+        }
+
+
+def export_dataset(
+    export_format: str = "zip",
+    shard_size: int = Config.EXPORT_SHARD_SIZE,
+    images_dir: Optional[str] = None,
+    labels_dir: Optional[str] = None,
+    class_names: Optional[List[str]] = None,
+    splits: Tuple[float, ...] = Config.EXPORT_SPLITS,
+    seed: int = Config.EXPORT_SPLIT_SEED,
+    workers: int = Config.EXPORT_WORKERS,
+) -> Path:
+    """Write the dataset archive, tar shards or a training-format export to EXPORTS_DIR; returns its path"""
+    with use_directories(images_dir, labels_dir) as default_dataset:
+        image_paths = FileUtils.get_image_paths()
+        labeled = {p.stem for p in Config.ANNOTATIONS_DIR.glob("*.txt")}
+        files = ExportUtils.collect_files(image_paths, labeled)
+        dataset_hash = ExportUtils.manifest_hash(files)
+        if export_format in ConvertUtils.FORMATS:
+            class_names = class_names or FileUtils.load_class_names()
+            if not class_names:
+                raise ValueError(f"{export_format} export needs class names: pass them or save a class list first")
+            target = ConvertUtils.target_dir(export_format, dataset_hash, class_names, splits, seed)
+            size_lookup = None
+            if default_dataset:
+                manifest = DatasetManifest()
+                size_lookup = lambda image_path: manifest.image_size(Path(image_path).name)
+            converted = ConvertUtils.export(
+                [p for p in image_paths if FileUtils.get_image_id(p) in labeled],
+                export_format,
+                class_names,
+                target,
+                splits,
+                seed,
+                size_lookup=size_lookup,
+                max_workers=workers,
+            )
+            for _ in converted:
+                pass
+            return target
+        if export_format == "shards":
+            for _ in ExportUtils.write_tar_shards(files, dataset_hash, shard_size):
+                pass
+            return ExportUtils.shards_dir(dataset_hash, shard_size)
+        for _ in ExportUtils.write_zip(files, dataset_hash):
+            pass
+        return ExportUtils.zip_path(dataset_hash)
+
+
+def remap_classes(
+    old_names: List[str],
+    new_names: List[str],
+    renames: Optional[Dict[str, Optional[str]]] = None,
+    apply: bool = False,
+    labels_dir: Optional[str] = None,
+) -> Dict:
+    """Remap class ids of every label file; a dry run unless apply is set"""
+    with use_directories(None, labels_dir) as default_dataset:
+        mapping = RemapUtils.build_mapping(old_names, new_names, renames)
+        summary = RemapUtils.remap_directory(mapping, dry_run=not apply)
+        if apply and default_dataset:
+            AnnotationStore().remap_classes(mapping, summary["mtimes"])
+            FileUtils.save_class_names(new_names)
+        return summary
+
+
+def dataset_stats(images_dir: Optional[str] = None, labels_dir: Optional[str] = None) -> Dict:
+    """Image, label and per-class box counts in one vectorized pass"""
+    with use_directories(images_dir, labels_dir):
+        image_paths = FileUtils.get_image_paths()
+        image_ids, boxes, image_index = AnnotationUtils.load_directory(Config.ANNOTATIONS_DIR)
+        image_id_set = {FileUtils.get_image_id(p) for p in image_paths}
+        counts = np.bincount(boxes[:, 0].astype(np.int64)) if len(boxes) else np.zeros(0, np.int64)
+        return {
+            "images": len(image_paths),
+            "labeled": len(image_id_set.intersection(image_ids)),
+            "boxes": int(len(boxes)),
+            "class_counts": {idx: int(c) for idx, c in enumerate(counts) if c},
+            "boxes_per_image": float(len(boxes) / len(image_ids)) if image_ids else 0.0,
+        }
@@ -0,0 +1,283 @@
+"""Headless benchmarks for the labeling hot paths.
+
+    python -m benchmarks.run --images 500 --width 1920 --height 1080 --boxes 20
+    python -m benchmarks.run --save-baseline          # store results as the baseline
+    python -m benchmarks.run --model data/models/yolov8n.pt
+
+Results are printed as JSON (and written to --output). When a baseline file
+exists every case is compared against it and the run exits with status 1 if
+any throughput dropped by more than --tolerance.
+"""
+import argparse
+import json
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import generate_dataset
+from config import Config
+from utils.annotation_store import AnnotationStore
+from utils.annotation_utils import AnnotationUtils
+from utils.autolabel_utils import AutoLabelUtils
+from utils.dataset_manifest import DatasetManifest
+from utils.export_utils import ExportUtils
+from utils.file_utils import FileUtils
+from utils.image_utils import ImageUtils
+from utils.prediction_cache import PredictionCache
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def measure(name: str, items: int, func: Callable[[], None], repeat: int = 1) -> Dict:
+    """Run func `repeat` times and report the best wall time, throughput and peak memory.
+
+    tracemalloc hooks every allocation and would slow the timed runs, so
+    peak memory comes from one extra untimed run.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = min(timings)
+    return {
+        "name": name,
+        "items": items,
+        "seconds": best,
+        "throughput": items / best if best > 0 else float("inf"),
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+
+
+def point_config_at(root: Path):
+    """Redirect the data directories to the synthetic dataset"""
+    Config.UPLOADS_DIR = root / "uploads"
+    Config.ANNOTATIONS_DIR = root / "annotations"
+    Config.PYRAMID_DIR = root / "pyramid"
+    Config.EXPORTS_DIR = root / "exports"
+    for dir_path in (Config.PYRAMID_DIR, Config.EXPORTS_DIR):
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+
+class _StubArray:
+    def __init__(self, array: np.ndarray):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.array
+
+
+class _StubBoxes:
+    def __init__(self, classes: np.ndarray, conf: np.ndarray, xywhn: np.ndarray):
+        self.cls = _StubArray(classes)
+        self.conf = _StubArray(conf)
+        self.xywhn = _StubArray(xywhn)
+
+    def __len__(self):
+        return len(self.cls.array)
+
+
+class _StubResult:
+    def __init__(self, boxes: _StubBoxes, orig_shape):
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+
+
+class _StubBackend:
+    """Stands in for ultralytics.YOLO: decodes inputs and returns fixed random boxes without inference"""
+
+    def __init__(self, boxes_per_image: int, num_classes: int = 5):
+        rng = np.random.default_rng(0)
+        self.names = {idx: f"class{idx + 1}" for idx in range(num_classes)}
+        self._classes = rng.integers(0, num_classes, size=boxes_per_image).astype(np.float32)
+        self._conf = rng.uniform(0.05, 1.0, size=boxes_per_image).astype(np.float32)
+        self._xywhn = rng.uniform(0.05, 0.5, size=(boxes_per_image, 4)).astype(np.float32)
+
+    def __call__(self, source, conf=0.25, verbose=True):
+        sources = source if isinstance(source, list) else [source]
+        # Decode file paths like the real model would, so predict and predict_batch compare fairly
+        sources = [cv2.imread(s) if isinstance(s, str) else s for s in sources]
+        return [_StubResult(_StubBoxes(self._classes, self._conf, self._xywhn), (0, 0)) for _ in sources]
+
+
+def make_model(model_path: str, boxes_per_image: int):
+    from models.yolo_model import YOLOModel
+
+    if model_path:
+        return YOLOModel(model_path)
+
+    class StubYOLOModel(YOLOModel):
+        def __init__(self):
+            self.model_path = "stub"
+            self.model_hash = None
+            self.model = _StubBackend(boxes_per_image)
+            self.class_names = self.model.names
+            self._lock = threading.Lock()
+
+    return StubYOLOModel()
+
+
+def run_benchmarks(args) -> List[Dict]:
+    root = Path(tempfile.mkdtemp(prefix="datalabel_bench_"))
+    try:
+        image_paths = generate_dataset(
+            root, args.images, args.width, args.height, args.boxes, seed=args.seed
+        )
+        point_config_at(root)
+        label_paths = [FileUtils.get_annotation_path(p) for p in image_paths]
+        n = len(image_paths)
+        results = []
+
+        loaded = {}
+
+        def read_labels():
+            for path in label_paths:
+                loaded[path] = AnnotationUtils.read_yolo_annotation(path)
+
+        results.append(measure("read_yolo_annotation", n, read_labels, args.repeat))
+
+        out_dir = root / "labels_out"
+        out_dir.mkdir()
+
+        def write_labels():
+            for path, annotations in loaded.items():
+                AnnotationUtils.write_yolo_annotation(str(out_dir / Path(path).name), annotations)
+
+        results.append(measure("write_yolo_annotation", n, write_labels, args.repeat))
+        results.append(measure("get_image_paths", n, FileUtils.get_image_paths, args.repeat))
+
+        manifest = DatasetManifest(root / "manifest.db", Config.UPLOADS_DIR)
+        results.append(measure("manifest_cold_scan", n, lambda: manifest.refresh(force=True)))
+        results.append(measure("manifest_image_paths", n, manifest.image_paths, args.repeat))
+
+        def decode_cold():
+            shutil.rmtree(Config.PYRAMID_DIR)
+            Config.PYRAMID_DIR.mkdir()
+            for path in image_paths:
+                ImageUtils.load_display_image(path)
+
+        def decode_warm():
+            for path in image_paths:
+                ImageUtils.load_display_image(path)
+
+        results.append(measure("display_decode_cold", n, decode_cold))
+        results.append(measure("display_decode_warm", n, decode_warm, args.repeat))
+
+        files = ExportUtils.collect_files(image_paths, {Path(p).stem for p in image_paths})
+
+        def export_zip():
+            for stale in Config.EXPORTS_DIR.glob("*.zip"):
+                stale.unlink()
+            for _ in ExportUtils.write_zip(files, "bench"):
+                pass
+
+        results.append(measure("export_zip", n, export_zip))
+
+        try:
+            model = make_model(args.model, args.boxes)
+        except ImportError as e:
+            print(f"Skipping model benchmarks: {e}", file=sys.stderr)
+            return results
+
+        subset = image_paths[:args.model_images]
+        results.append(measure(
+            "yolo_predict", len(subset),
+            lambda: [model.predict(p, 0.25) for p in subset],
+        ))
+        results.append(measure(
+            "yolo_predict_batch", len(subset),
+            lambda: list(model.predict_batch(subset, conf_threshold=0.25)),
+        ))
+
+        store = AnnotationStore(root / "annotations.db")
+        cache = PredictionCache(root / "predictions.db")
+        classes = model.names_list()
+        list(AutoLabelUtils.label_images(model, subset, classes, 0.25, store=store, cache=cache))
+        results.append(measure(
+            "autolabel_rethreshold_cached", len(subset),
+            lambda: list(AutoLabelUtils.label_images(model, subset, classes, 0.5, store=store, cache=cache)),
+            args.repeat,
+        ))
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(results: List[Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Names of cases whose throughput fell below baseline * (1 - tolerance)"""
+    regressions = []
+    for result in results:
+        reference = baseline.get(result["name"])
+        if reference is None:
+            continue
+        result["baseline_throughput"] = reference["throughput"]
+        result["ratio"] = result["throughput"] / reference["throughput"]
+        result["regression"] = result["ratio"] < 1 - tolerance
+        if result["regression"]:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--boxes", type=int, default=10, help="boxes per image")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, best time is kept")
+    parser.add_argument("--model", default="", help="YOLO weights; a stub backend is used if omitted")
+    parser.add_argument("--model-images", type=int, default=32)
+    parser.add_argument("--output", default="", help="write results JSON to this file")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    report = {
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")},
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "results": results,
+        "regressions": [],
+    }
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump({r["name"]: r for r in results}, f, indent=2)
+    elif baseline_path.exists():
+        with open(baseline_path) as f:
+            report["regressions"] = compare(results, json.load(f), args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    return 1 if report["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+from pathlib import Path
+from typing import List
+import numpy as np
+from PIL import Image
+
+
+def generate_dataset(
+    root: Path,
+    num_images: int = 200,
+    width: int = 1920,
+    height: int = 1080,
+    boxes_per_image: int = 10,
+    num_classes: int = 5,
+    seed: int = 0,
+) -> List[str]:
+    """Write random JPEG images and matching YOLO labels under root/uploads and root/annotations"""
+    rng = np.random.default_rng(seed)
+    images_dir = Path(root) / "uploads"
+    labels_dir = Path(root) / "annotations"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    labels_dir.mkdir(parents=True, exist_ok=True)
+
+    # Smooth noise compresses like a photo rather than like pure noise
+    small = rng.integers(0, 255, size=(height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    base = Image.fromarray(small).resize((width, height), Image.BILINEAR)
+
+    image_paths = []
+    for idx in range(num_images):
+        image_path = images_dir / f"synthetic_{idx:06d}.jpg"
+        shifted = np.roll(np.asarray(base), shift=idx * 7, axis=1)
+        Image.fromarray(shifted).save(image_path, quality=90)
+        image_paths.append(str(image_path))
+
+        wh = rng.uniform(0.02, 0.3, size=(boxes_per_image, 2))
+        centers = rng.uniform(wh / 2, 1 - wh / 2)
+        classes = rng.integers(0, num_classes, size=boxes_per_image)
+        with open(labels_dir / f"{image_path.stem}.txt", "w") as f:
+            for cls, (xc, yc), (w, h) in zip(classes, centers, wh):
+                f.write(f"{cls} {xc:.6f} {yc:.6f} {w:.6f} {h:.6f}\n")
+    return image_paths
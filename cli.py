@@ -0,0 +1,151 @@
+"""Command-line entry point for running the labeling tool without a browser.
+
+    python cli.py label data/models/best.pt --classes car,person --conf 0.4 --workers 4
+    python cli.py label data/models/best.pt --tile-size 640 --tile-overlap 0.2
+    python cli.py export --format shards --shard-size 1000
+    python cli.py export --format coco --splits 0.8,0.1,0.1
+    python cli.py remap --old car,person --new vehicle,person --rename car=vehicle --apply
+    python cli.py stats
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def _class_list(value: Optional[str]) -> Optional[List[str]]:
+    return [c.strip() for c in value.split(",") if c.strip()] if value else None
+
+
+def _saved_classes() -> List[str]:
+    from utils.file_utils import FileUtils
+
+    names = FileUtils.load_class_names()
+    if not names:
+        sys.exit("No class list given and none saved in the classes file")
+    return names
+
+
+def cmd_label(args):
+    import api
+
+    def progress(done: int, total: int):
+        print(f"\r{done} / {total}", end="", file=sys.stderr, flush=True)
+
+    summary = api.label_directory(
+        args.model,
+        _class_list(args.classes) or _saved_classes(),
+        conf_threshold=args.conf,
+        images_dir=args.images_dir,
+        labels_dir=args.labels_dir,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        resume=not args.no_resume,
+        progress=progress,
+        tile_size=args.tile_size,
+        tile_overlap=args.tile_overlap,
+        tile_batch_size=args.tile_batch_size,
+        class_filter=_class_list(args.only),
+    )
+    print(file=sys.stderr)
+    return summary
+
+
+def cmd_export(args):
+    import api
+
+    class_names = _class_list(args.classes)
+    if class_names is None and args.format in ("yolo", "coco", "voc"):
+        class_names = _saved_classes()
+    path = api.export_dataset(
+        args.format,
+        args.shard_size,
+        args.images_dir,
+        args.labels_dir,
+        class_names=class_names,
+        splits=tuple(float(x) for x in args.splits.split(",")),
+        seed=args.seed,
+        workers=args.workers,
+    )
+    return {"path": str(path)}
+
+
+def cmd_remap(args):
+    import api
+
+    renames = {}
+    for item in args.rename:
+        old, _, new = item.partition("=")
+        renames[old] = new
+    for name in args.delete:
+        renames[name] = None
+    summary = api.remap_classes(
+        _class_list(args.old) or _saved_classes(),
+        _class_list(args.new),
+        renames,
+        apply=args.apply,
+        labels_dir=args.labels_dir,
+    )
+    summary.pop("mtimes", None)
+    return summary
+
+
+def cmd_stats(args):
+    import api
+
+    return api.dataset_stats(args.images_dir, args.labels_dir)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images-dir", help=f"images directory (default {Config.UPLOADS_DIR})")
+    parser.add_argument("--labels-dir", help=f"YOLO labels directory (default {Config.ANNOTATIONS_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    label = commands.add_parser("label", help="auto-label every image with a YOLO model")
+    label.add_argument("model", help="path to .pt weights")
+    label.add_argument("--classes", help="comma-separated project classes (default: saved class list)")
+    label.add_argument("--conf", type=float, default=0.5)
+    label.add_argument("--workers", type=int, default=1, help="worker processes, one model each")
+    label.add_argument("--batch-size", type=int, default=Config.AUTOLABEL_BATCH_SIZE)
+    label.add_argument("--only", help="comma-separated subset of classes to write")
+    label.add_argument("--no-resume", action="store_true", help="ignore the checkpoint of a previous run")
+    label.add_argument("--tile-size", type=int, help="label overlapping tiles of this size (px) instead of the whole image")
+    label.add_argument("--tile-overlap", type=float, default=Config.TILE_OVERLAP)
+    label.add_argument("--tile-batch-size", type=int, default=Config.TILE_BATCH_SIZE)
+    label.set_defaults(func=cmd_label)
+
+    export = commands.add_parser("export", help="write the dataset archive to the exports directory")
+    export.add_argument("--format", choices=["zip", "shards", "yolo", "coco", "voc"], default="zip")
+    export.add_argument("--shard-size", type=int, default=Config.EXPORT_SHARD_SIZE)
+    export.add_argument("--classes", help="comma-separated class names (default: saved class list)")
+    export.add_argument("--splits", default=",".join(str(f) for f in Config.EXPORT_SPLITS),
+                        help="train,val,test fractions for yolo/coco/voc, stratified by class")
+    export.add_argument("--seed", type=int, default=Config.EXPORT_SPLIT_SEED)
+    export.add_argument("--workers", type=int, default=Config.EXPORT_WORKERS)
+    export.set_defaults(func=cmd_export)
+
+    remap = commands.add_parser("remap", help="rewrite class ids of all labels (dry run by default)")
+    remap.add_argument("--old", help="comma-separated current classes (default: saved class list)")
+    remap.add_argument("--new", required=True, help="comma-separated new classes")
+    remap.add_argument("--rename", action="append", default=[], metavar="OLD=NEW")
+    remap.add_argument("--delete", action="append", default=[], metavar="NAME")
+    remap.add_argument("--apply", action="store_true", help="write the changes")
+    remap.set_defaults(func=cmd_remap)
+
+    stats = commands.add_parser("stats", help="dataset and class statistics")
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    result = args.func(args)
+    print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,136 +1,497 @@
 from pathlib import Path
-from typing import List, Tuple
-import zipfile
-import io
-import cv2
-import numpy as np
+from typing import Dict, List, Optional, Tuple
 import streamlit as st
+import numpy as np
 from PIL import Image
 from streamlit_drawable_canvas import st_canvas
 
 from config import Config
 from utils.file_utils import FileUtils
 from utils.annotation_utils import AnnotationUtils
+from utils.image_utils import ImageUtils
+from utils.convert_utils import ConvertUtils
+from utils.export_utils import ExportUtils
+from utils.remap_utils import RemapUtils
+from utils.job_runner import Job
+from utils.metrics import Metrics
+from components.resources import (
+    get_annotation_session, get_annotation_store, get_dataset_manifest, get_image_cache, get_job_runner,
+    get_lease_session_id, get_lease_store, get_phash_index, get_prediction_cache, get_review_queue, write_annotations
+)
+
+ORDER_SEQUENTIAL = "Sequential"
+ORDER_INFORMATIVE = "Most informative first"
+ORDER_LEASED = "My batch"
+
+# Export choices; training formats map to their ConvertUtils format, archives to None
+EXPORT_FORMATS = {
+    "Zip archive": None,
+    "Tar shards": None,
+    "YOLO + data.yaml": ConvertUtils.FORMAT_YOLO,
+    "COCO JSON": ConvertUtils.FORMAT_COCO,
+    "Pascal VOC": ConvertUtils.FORMAT_VOC,
+}
 
 
 class AnnotatorComponent:
     def __init__(self):
         self.file_utils = FileUtils()
         self.annotation_utils = AnnotationUtils()
-        self.current_image_idx: int = 0
+        self.annotation_store = get_annotation_store()
+        self.image_cache = get_image_cache()
+        self.job_runner = get_job_runner()
+        self.manifest = get_dataset_manifest()
+        self.prediction_cache = get_prediction_cache()
+        self.session = get_annotation_session()
+        self.review_queue = get_review_queue()
+        self.lease_store = get_lease_store()
+        self.export_utils = ExportUtils()
         self.annotations: List[Tuple[int, float, float, float, float]] = []
         self.class_names: List[str] = []
         self.image_paths: List[str] = []
 
+    @property
+    def current_image_idx(self) -> int:
+        # Kept in session state: the component is rebuilt on every rerun
+        return st.session_state.get("current_image_idx", 0)
+
+    @current_image_idx.setter
+    def current_image_idx(self, idx: int):
+        st.session_state.current_image_idx = idx
+
     def render_class_input(self) -> List[str]:
         st.subheader("Define Classes")
+        saved_names = self.file_utils.load_class_names()
         class_input = st.text_area(
             "Enter class names (one per line)",
-            value="class1\nclass2\nclass3",
+            value="\n".join(saved_names) if saved_names else "class1\nclass2\nclass3",
             height=150,
         )
         return [c.strip() for c in class_input.split("\n") if c.strip()]
 
+    def render_class_remap(self, class_names: List[str]):
+        """Offer to rewrite existing annotations when the class list changes"""
+        saved_names = self.file_utils.load_class_names()
+        if saved_names == class_names:
+            return
+        counts = self.annotation_store.class_counts() if saved_names else {}
+        if not counts:
+            self.file_utils.save_class_names(class_names)
+            return
+
+        st.warning("Class list changed: existing annotations still use the old class ids.")
+        options = ["(delete)"] + class_names
+        renames = {}
+        for old_id, name in enumerate(saved_names):
+            if name in class_names:
+                default = name
+            elif old_id < len(class_names) and class_names[old_id] not in saved_names:
+                default = class_names[old_id]  # most likely renamed in place
+            else:
+                default = "(delete)"
+            target = st.selectbox(
+                f"{name} ({counts.get(old_id, 0)} boxes) →",
+                options,
+                index=options.index(default),
+                key=f"remap_{old_id}_{name}",
+            )
+            renames[name] = None if target == "(delete)" else target
+        mapping = RemapUtils.build_mapping(saved_names, class_names, renames)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("Preview remap"):
+                summary = RemapUtils.remap_directory(mapping, dry_run=True)
+                st.json({k: v for k, v in summary.items() if k != "mtimes"})
+        with col2:
+            if st.button("Apply remap"):
+                self.flush_annotations()
+                with st.spinner("Rewriting annotations..."):
+                    summary = RemapUtils.remap_directory(mapping, dry_run=False)
+                    self.annotation_store.remap_classes(mapping, summary["mtimes"])
+                self._drop_cached_annotations()
+                self.file_utils.save_class_names(class_names)
+                st.success(
+                    f"Rewrote {summary['files_changed']} files, "
+                    f"deleted {summary['boxes_deleted']} boxes"
+                )
+        with col3:
+            if st.button("Keep class ids"):
+                self.file_utils.save_class_names(class_names)
+                st.rerun()
+
+    def _drop_cached_annotations(self):
+        self.image_cache.clear_annotations()
+        self.session.clear()
+
+    def flush_annotations(self) -> int:
+        """Write every image edited in this session"""
+        return self.session.flush(write_annotations)
+
     def render_image_navigation(self):
+        order = st.radio(
+            "Order", [ORDER_SEQUENTIAL, ORDER_INFORMATIVE, ORDER_LEASED], horizontal=True,
+            help="Most informative first serves unreviewed images by model uncertainty (needs cached predictions). "
+                 "My batch hands out unreviewed images that no other annotator is working on.",
+        )
+        review_mode = order == ORDER_INFORMATIVE
+        lease_mode = order == ORDER_LEASED
+        if review_mode:
+            self.review_queue.sync(self.prediction_cache, self.annotation_store)
+        batch = []
+        if lease_mode:
+            batch = self._leased_batch()
+            current_id = self.file_utils.get_image_id(self.image_paths[self.current_image_idx])
+            # An image reached with Previous is outside the batch on purpose: stay on it
+            if batch and current_id not in batch and current_id != st.session_state.get("lease_revisit"):
+                self._go_to(batch[0])
+
         col1, col2, col3, col4 = st.columns([1, 1, 1, 2])
         with col1:
             if st.button("Previous"):
-                if self.current_image_idx > 0:
+                self.flush_annotations()
+                history = st.session_state.get("review_history", [])
+                if (review_mode or lease_mode) and history:
+                    image_id = history.pop()
+                    st.session_state.lease_revisit = image_id
+                    self._go_to(image_id)
+                elif self.current_image_idx > 0:
                     self.current_image_idx -= 1
         with col2:
             if st.button("Next"):
-                if self.current_image_idx < len(self.image_paths) - 1:
+                self.flush_annotations()
+                if review_mode:
+                    self._next_informative()
+                elif lease_mode:
+                    self._next_leased()
+                elif self.current_image_idx < len(self.image_paths) - 1:
                     self.current_image_idx += 1
         with col3:
             if st.button("Delete Current"):
-                self.file_utils.delete_image_and_annotation(
-                    self.image_paths[self.current_image_idx]
-                )
-                self.image_paths.pop(self.current_image_idx)
+                image_path = self.image_paths[self.current_image_idx]
+                self.session.discard(image_path)
+                self.flush_annotations()
+                self.file_utils.delete_image_and_annotation(image_path)
+                self.lease_store.forget(self.file_utils.get_image_id(image_path))
+                self.annotation_store.delete(self.file_utils.get_image_id(image_path))
+                self.prediction_cache.delete_image(self.file_utils.get_image_id(image_path))
+                self.review_queue.discard(self.file_utils.get_image_id(image_path))
+                ImageUtils.delete_pyramid(image_path)
+                self.image_cache.invalidate(image_path)
+                self.manifest.remove(Path(image_path).name)
+                get_phash_index().discard(Path(image_path).name)
+                # The list may be shared with the manifest: replace it, do not mutate it
+                idx = self.current_image_idx
+                self.image_paths = self.image_paths[:idx] + self.image_paths[idx + 1:]
+                st.session_state.image_paths = self.image_paths
                 if self.current_image_idx >= len(self.image_paths):
                     self.current_image_idx = max(0, len(self.image_paths) - 1)
         with col4:
             st.write(f"Image {self.current_image_idx + 1} / {len(self.image_paths)}")
+            if review_mode:
+                st.caption(f"Review queue: {len(self.review_queue)} unreviewed images with predictions")
+            if lease_mode:
+                st.caption(
+                    f"Your batch: {len(batch)} images · "
+                    f"{self.lease_store.active_sessions()} annotators holding leases"
+                )
 
-    def render_annotation_controls(self, image: np.ndarray):
-        if image is None:
+    def _leased_batch(self) -> List[str]:
+        """This session's leased image ids, topped up from unreviewed images nobody holds"""
+        session_id = get_lease_session_id()
+        index = self._image_index()
+        batch = [image_id for image_id in self.lease_store.leased(session_id) if image_id in index]
+        if len(batch) < Config.LEASE_BATCH_SIZE:
+            # Images completed in any session are skipped by acquire itself
+            reviewed = self.annotation_store.reviewed_image_ids()
+            candidates = (image_id for image_id in index if image_id not in reviewed)
+            batch = [image_id for image_id in self.lease_store.acquire(session_id, candidates) if image_id in index]
+        return batch
+
+    def _next_leased(self):
+        """Mark the current image done and move to the next one in the batch"""
+        current_id = self.file_utils.get_image_id(self.image_paths[self.current_image_idx])
+        st.session_state.lease_revisit = None
+        self.lease_store.complete(get_lease_session_id(), [current_id])
+        batch = self._leased_batch()
+        if not batch:
+            st.info("No unreviewed images left that another annotator is not already working on.")
             return
+        st.session_state.setdefault("review_history", []).append(current_id)
+        self._go_to(batch[0])
+
+    def _next_informative(self):
+        """Mark the current image reviewed and jump to the top of the review queue"""
+        current_id = self.file_utils.get_image_id(self.image_paths[self.current_image_idx])
+        self.review_queue.mark_reviewed(current_id)
+        index = self._image_index()
+        while True:
+            top = self.review_queue.peek()
+            if top is None:
+                st.info("Review queue is empty: label more images with a model first.")
+                return
+            if top[0] in index:
+                break
+            self.review_queue.discard(top[0])  # predicted once, no longer in the dataset
+        st.session_state.setdefault("review_history", []).append(current_id)
+        self.current_image_idx = index[top[0]]
 
-        h, w = image.shape[:2]
+    def _go_to(self, image_id: str):
+        index = self._image_index()
+        if image_id in index:
+            self.current_image_idx = index[image_id]
+
+    def _image_index(self) -> Dict[str, int]:
+        """image_id -> position in image_paths, rebuilt only when the list changes"""
+        cached = st.session_state.get("image_index")
+        if cached is None or cached[0] is not self.image_paths:
+            cached = (self.image_paths, {self.file_utils.get_image_id(p): i for i, p in enumerate(self.image_paths)})
+            st.session_state.image_index = cached
+        return cached[1]
+
+    def render_annotation_controls(self, display_image: Image.Image, native_size: Tuple[int, int]):
+        if display_image is None:
+            return
+
+        # The canvas works at display resolution; YOLO coordinates are normalized,
+        # so they map to the native image unchanged
+        w, h = display_image.size
+        if (w, h) != native_size:
+            st.caption(f"Original {native_size[0]}×{native_size[1]}, shown at {w}×{h}")
         image_path = self.image_paths[self.current_image_idx]
-        ann_path = self.file_utils.get_annotation_path(image_path)
+        image_id = self.file_utils.get_image_id(image_path)
+        holder = self.lease_store.holder(image_id)
+        if holder is not None and holder != get_lease_session_id():
+            st.warning("Another annotator has this image in their batch: saving may conflict with their edits.")
 
         # Загружаем аннотации только один раз
-        if f"annotations_{self.current_image_idx}" not in st.session_state:
-            st.session_state[f"annotations_{self.current_image_idx}"] = \
-                self.annotation_utils.read_yolo_annotation(ann_path)
-
-        annotations = st.session_state[f"annotations_{self.current_image_idx}"]
+        annotations = self.session.load(image_path, self._load_annotations, self.lease_store.version)
 
         new_class = st.selectbox("Class for new boxes", options=self.class_names)
         mode = st.radio("Annotation mode", ["Draw new", "Edit existing"])
         drawing_mode = "rect" if mode == "Draw new" else "transform"
 
-        shapes = []
-        for idx, (cls, xc, yc, bw, bh) in enumerate(annotations):
-            left = (xc - bw / 2) * w
-            top = (yc - bh / 2) * h
-            shapes.append({
+        shapes = self._annotations_to_shapes(annotations, w, h)
+
+        with Metrics.timer("annotator.canvas"):
+            canvas_result = st_canvas(
+                fill_color="rgba(0,0,0,0)",
+                stroke_width=2,
+                stroke_color=Config.get_class_color(self.class_names.index(new_class)),
+                background_image=display_image,
+                update_streamlit=True,
+                height=h,
+                width=w,
+                drawing_mode=drawing_mode,
+                initial_drawing={"objects": shapes},
+                key=f"canvas_{image_id}"
+            )
+
+        # Every canvas change lands in the session; files are written on flush
+        if canvas_result and canvas_result.json_data and "objects" in canvas_result.json_data:
+            self.session.update(
+                image_path,
+                self._objects_to_annotations(
+                    canvas_result.json_data["objects"], w, h, self.class_names.index(new_class), annotations
+                ),
+            )
+
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            if st.button("Сохранить аннотации"):
+                self.flush_annotations()
+                if not self.session.conflicts:
+                    st.success("Аннотации сохранены!")
+        with col2:
+            if self.session.dirty_count:
+                st.caption(
+                    f"Несохранённых изображений: {self.session.dirty_count} "
+                    f"(автосохранение через {Config.AUTOSAVE_DELAY:.0f} с)"
+                )
+        self.render_conflicts()
+
+        # Предпросмотр с подписями
+        # preview = self.annotation_utils.draw_bboxes(image, annotations, self.class_names)
+        # st.image(preview, use_column_width=True, channels="BGR", output_format="PNG")
+
+    def render_conflicts(self):
+        """Edits refused because someone else saved the image first"""
+        for image_id, path in list(self.session.conflicts.items()):
+            st.warning(f"{Path(path).name} was saved by another annotator after you opened it; your edits were not written.")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Overwrite with my edits", key=f"overwrite_{image_id}"):
+                    self.session.resolve_conflict(path, self.lease_store.version(image_id))
+                    self.flush_annotations()
+                    st.rerun()
+            with col2:
+                if st.button("Load their version", key=f"reload_{image_id}"):
+                    self.session.resolve_conflict(path)
+                    st.rerun()
+
+    def _load_annotations(self, image_path: str) -> List[Tuple[int, float, float, float, float]]:
+        annotations = self.image_cache.get_annotations(image_path)
+        if annotations is None:
+            annotations = self.annotation_store.get(self.file_utils.get_image_id(image_path)) or []
+        return annotations
+
+    @staticmethod
+    def _annotations_to_shapes(annotations, w: int, h: int) -> List[dict]:
+        """Canvas rectangles for YOLO annotations at display size w×h"""
+        boxes = AnnotationUtils.to_array(annotations)
+        pixel = AnnotationUtils.normalized_to_pixel(boxes[:, 1:], w, h)
+        corners = AnnotationUtils.xywh_to_xyxy(pixel)
+        return [
+            {
                 "type": "rect",
                 "left": left,
                 "top": top,
-                "width": bw * w,
-                "height": bh * h,
+                "width": bw,
+                "height": bh,
                 "strokeWidth": 2,
-                "stroke": Config.get_class_color(cls),
+                "stroke": Config.get_class_color(int(cls)),
                 "fill": "rgba(0,0,0,0)",
-                "metadata": {"class_id": cls},
+                "metadata": {"class_id": int(cls)},
                 "id": str(idx),
-            })
-
-        # Convert BGR→RGB for display
-        bg_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-
-        canvas_result = st_canvas(
-            fill_color="rgba(0,0,0,0)",
-            stroke_width=2,
-            stroke_color=Config.get_class_color(self.class_names.index(new_class)),
-            background_image=bg_pil,
-            update_streamlit=True,
-            height=h,
-            width=w,
-            drawing_mode=drawing_mode,
-            initial_drawing={"objects": shapes},
-            key=f"canvas_{self.current_image_idx}"
-        )
+            }
+            for idx, (cls, (left, top), (bw, bh)) in enumerate(
+                zip(boxes[:, 0].tolist(), corners[:, :2].tolist(), pixel[:, 2:].tolist())
+            )
+        ]
 
-        # Сохраняем аннотации по кнопке
-        if st.button("Сохранить аннотации"):
-            new_anns: List[Tuple[int, float, float, float, float]] = []
+    @staticmethod
+    def _objects_to_annotations(
+        objects: List[dict], w: int, h: int, default_class: int, previous: Optional[List[Tuple]] = None
+    ) -> List[Tuple[int, float, float, float, float]]:
+        """YOLO annotations from canvas rectangles drawn at display size w×h.
 
-            if canvas_result and canvas_result.json_data and "objects" in canvas_result.json_data:
-                for obj in canvas_result.json_data["objects"]:
-                    left, top = obj["left"], obj["top"]
-                    pw, ph = obj["width"], obj["height"]
+        Drawn rectangles carry no class; the canvas keeps object order, so
+        one already in ``previous`` keeps the class it got when it was drawn.
+        """
+        if not objects:
+            return []
+        previous = previous or []
+        # Fabric keeps resized boxes at their original width/height plus a scale factor
+        rects = np.array(
+            [
+                (obj["left"], obj["top"],
+                 obj["width"] * obj.get("scaleX", 1), obj["height"] * obj.get("scaleY", 1))
+                for obj in objects
+            ],
+            dtype=np.float32,
+        )
+        classes = np.array(
+            [
+                (obj.get("metadata") or {}).get(
+                    "class_id", previous[idx][0] if idx < len(previous) else default_class
+                )
+                for idx, obj in enumerate(objects)
+            ],
+            dtype=np.float32,
+        )
+        centers = AnnotationUtils.xyxy_to_xywh(
+            np.concatenate([rects[:, :2], rects[:, :2] + rects[:, 2:]], axis=1)
+        )
+        normalized = AnnotationUtils.pixel_to_normalized(centers, w, h)
+        return AnnotationUtils.to_tuples(np.column_stack([classes, normalized]))
 
-                    xc_new = (left + pw / 2) / w
-                    yc_new = (top + ph / 2) / h
-                    bw_new = pw / w
-                    bh_new = ph / h
-                    cls_new = obj.get("metadata", {}).get(
-                        "class_id", self.class_names.index(new_class)
-                    )
+    def render_export(self, image_paths: List[str]):
+        """Build the dataset archive or a training-format export in the background"""
+        export_format = st.radio("Export format", list(EXPORT_FORMATS), horizontal=True)
+        converted_format = EXPORT_FORMATS[export_format]
+        shard_size = Config.EXPORT_SHARD_SIZE
+        splits = Config.EXPORT_SPLITS
+        if export_format == "Tar shards":
+            shard_size = int(st.number_input("Images per shard", min_value=1, value=Config.EXPORT_SHARD_SIZE))
+        elif converted_format is not None:
+            col1, col2 = st.columns(2)
+            with col1:
+                val = st.slider("Validation fraction", 0.0, 0.5, Config.EXPORT_SPLITS[1], 0.05)
+            with col2:
+                test = st.slider("Test fraction", 0.0, 0.5, Config.EXPORT_SPLITS[2], 0.05)
+            splits = (max(0.0, 1.0 - val - test), val, test)
+            st.caption("Splits are stratified by class: each image is grouped by its rarest class")
 
-                    new_anns.append((cls_new, xc_new, yc_new, bw_new, bh_new))
+        # === Кнопка для скачивания всего размеченного датасета ===
+        if st.button("📦 Скачать весь размеченный датасет (в zip)"):
+            labeled_ids = self.annotation_store.labeled_image_ids()
+            files = self.export_utils.collect_files(image_paths, labeled_ids)
+            dataset_hash = self.export_utils.manifest_hash(files)
+            if converted_format is not None:
+                class_names = list(self.class_names)
+                target = ConvertUtils.target_dir(
+                    converted_format, dataset_hash, class_names, splits, Config.EXPORT_SPLIT_SEED
+                )
+                job_id = f"export_{target.name}"
+                files = [p for p in image_paths if self.file_utils.get_image_id(p) in labeled_ids]
+                manifest = self.manifest
+                handler = lambda items, cancel_event: ConvertUtils.export(
+                    items, converted_format, class_names, target, splits,
+                    size_lookup=lambda path: manifest.image_size(Path(path).name),
+                    cancel_event=cancel_event,
+                )
+            elif export_format == "Tar shards":
+                target = self.export_utils.shards_dir(dataset_hash, shard_size)
+                job_id = f"export_shards_{dataset_hash}_{shard_size}"
+                handler = lambda items, cancel_event: ExportUtils.write_tar_shards(
+                    items, dataset_hash, shard_size, cancel_event
+                )
+            else:
+                target = self.export_utils.zip_path(dataset_hash)
+                job_id = f"export_zip_{dataset_hash}"
+                handler = lambda items, cancel_event: ExportUtils.write_zip(items, dataset_hash, cancel_event)
+            self.job_runner.submit(job_id, files, handler, checkpoint=False)
+            st.session_state["export_job"] = (job_id, export_format, target)
 
-            self.annotation_utils.write_yolo_annotation(ann_path, new_anns)
-            st.session_state[f"annotations_{self.current_image_idx}"] = new_anns
-            st.success("Аннотации сохранены!")
+        if "export_job" not in st.session_state:
+            return
+        job_id, job_format, target = st.session_state["export_job"]
+        job = self.job_runner.get(job_id)
+        if job is None:
+            return
 
-        # Предпросмотр с подписями
-        # preview = self.annotation_utils.draw_bboxes(image, annotations, self.class_names)
-        # st.image(preview, use_column_width=True, channels="BGR", output_format="PNG")
+        if job.is_active:
+            st.progress(job.progress, text=f"Exporting {job.done} / {job.total} files")
+            if st.button("Cancel Export"):
+                job.cancel()
+        elif job.status == Job.FAILED:
+            st.error(f"Export failed: {job.error}")
+        elif job.status == Job.COMPLETED and job_format != "Zip archive":
+            st.success(f"{job_format} written to {target}")
+            if job.failed:
+                st.warning(f"{len(job.failed)} images could not be read and were left out")
+        elif job.status == Job.COMPLETED:
+            try:
+                size = target.stat().st_size
+            except FileNotFoundError:
+                # A newer export of the same dataset removed this archive
+                st.info("This archive was replaced by a newer export; export again to download it")
+                return
+            if size > Config.EXPORT_DOWNLOAD_MAX_MB * 1024 * 1024:
+                st.success(f"Archive written to {target}")
+            elif st.session_state.get("export_download") != str(target):
+                # Reading the archive for download_button happens on every rerun,
+                # so only do it once the user asks for the download
+                st.success(f"Archive written to {target}")
+                if st.button("Prepare download"):
+                    st.session_state["export_download"] = str(target)
+                    st.rerun()
+            else:
+                try:
+                    data = target.read_bytes()
+                except FileNotFoundError:
+                    st.session_state.pop("export_download", None)
+                    st.info("This archive was replaced by a newer export; export again to download it")
+                    return
+                if st.download_button(
+                    label="⬇️ Скачать zip-файл",
+                    data=data,
+                    file_name="annotated_dataset.zip",
+                    mime="application/zip"
+                ):
+                    st.session_state.pop("export_download", None)
 
+    @Metrics.timed("render.annotator")
     def render(self, class_names: List[str], image_paths: List[str]):
         self.class_names = class_names
         self.image_paths = image_paths
@@ -146,30 +507,19 @@ class AnnotatorComponent:
 
         image_path = self.image_paths[self.current_image_idx]
         try:
-            pil_image = Image.open(image_path)
-            image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            display_image, native_size = self.image_cache.get(image_path)
         except Exception as e:
             st.error(f"❌ Ошибка загрузки изображения: {image_path}\n{e}")
             return
+        self.image_cache.prefetch(self.image_paths, self.current_image_idx)
 
-        self.render_annotation_controls(image)
-        # === Кнопка для скачивания всего размеченного датасета ===
-        if st.button("📦 Скачать весь размеченный датасет (в zip)"):
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w") as zipf:
-                for image_path in image_paths:
-                    image_file = Path(image_path)
-                    ann_file = Path(self.file_utils.get_annotation_path(image_path))
-
-                    if image_file.exists():
-                        zipf.write(image_file, arcname=f"images/{image_file.name}")
-                    if ann_file.exists():
-                        zipf.write(ann_file, arcname=f"labels/{ann_file.name}")
-
-            zip_buffer.seek(0)
-            st.download_button(
-                label="⬇️ Скачать zip-файл",
-                data=zip_buffer,
-                file_name="annotated_dataset.zip",
-                mime="application/zip"
-            )        
+        self.render_annotation_controls(display_image, native_size)
+        self.render_export(image_paths)
+
+        with st.expander("Image cache stats"):
+            stats = self.image_cache.stats()
+            st.caption(
+                f"Hits {stats['hits']}, misses {stats['misses']} "
+                f"(hit rate {stats['hit_rate']:.0%}), prefetched {stats['prefetched']}, "
+                f"{stats['images']} images / {stats['memory_mb']:.0f} MB cached"
+            )
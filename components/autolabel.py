@@ -1,18 +1,34 @@
 import streamlit as st
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 from config import Config
 from models.yolo_model import YOLOModel
 from utils.file_utils import FileUtils
 from utils.annotation_utils import AnnotationUtils
+from utils.autolabel_utils import AutoLabelUtils
+from utils.model_utils import ModelUtils
+from utils.job_runner import Job
+from utils.prediction_cache import PredictionCache
+from utils.metrics import Metrics
+from components.resources import (
+    get_annotation_session, get_annotation_store, get_dataset_manifest, get_image_cache,
+    get_job_runner, get_model_registry, get_prediction_cache, write_annotations
+)
 
 
 class AutoLabelComponent:
     def __init__(self):
         self.file_utils = FileUtils()
         self.annotation_utils = AnnotationUtils()
+        self.job_runner = get_job_runner()
+        self.model_registry = get_model_registry()
+        self.annotation_store = get_annotation_store()
+        self.prediction_cache = get_prediction_cache()
+        self.image_cache = get_image_cache()
+        self.session = get_annotation_session()
 
+    @Metrics.timed("render.autolabel")
     def render(self, class_names: List[str], image_paths: List[str]):
         if not class_names or not image_paths:
             st.warning("Define classes and upload images first.")
@@ -20,59 +36,175 @@ class AutoLabelComponent:
 
         st.header("Auto-Labeling")
 
-        uploaded_model = st.file_uploader("Upload YOLOv8 `.pt` model", type=["pt"])
-        if uploaded_model:
-            model_path = Path(Config.MODELS_DIR) / uploaded_model.name
-            with open(model_path, "wb") as f:
-                f.write(uploaded_model.getbuffer())
-            st.success(f"Model uploaded: {uploaded_model.name}")
-
-            try:
-                with st.spinner("Loading model..."):
-                    st.session_state["yolo_model"] = YOLOModel(str(model_path))
-                st.success("Model loaded successfully!")
-            except Exception as e:
-                st.error(f"Failed to load model: {e}")
-                return
-
-        if "yolo_model" not in st.session_state or st.session_state["yolo_model"] is None:
+        model_path = self.render_model_source()
+        if model_path:
+            st.session_state["yolo_model_path"] = model_path
+        model_path = st.session_state.get("yolo_model_path")
+        if not model_path:
             st.info("Upload and load a YOLO model to enable auto-labeling.")
             return
+        try:
+            # Resolved on every rerun: only the registry holds the model, so its budget can unload it
+            with st.spinner("Loading model..."):
+                model = self.model_registry.get(model_path)
+            st.caption(f"Model ready: {Path(model_path).name}")
+        except Exception as e:
+            st.session_state.pop("yolo_model_path", None)
+            st.error(f"Failed to load model: {e}")
+            return
 
-        model = st.session_state["yolo_model"]
         conf = st.slider("Confidence threshold", 0.0, 1.0, 0.5, 0.01)
+        class_filter = st.multiselect("Classes to label", class_names, default=class_names)
+        if set(class_filter) == set(class_names):
+            class_filter = None
+        tiling = self.render_tiling_settings()
+
+        model_key = PredictionCache.model_key(
+            model.model_hash or model.model_path, tiling["tile_size"], tiling["tile_overlap"]
+        )
+        cached = self.prediction_cache.count(model_key)
+        if cached:
+            st.caption(
+                f"{cached} images have cached predictions for this model: "
+                "changing the threshold or classes re-labels them without inference"
+            )
 
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Label Current Image"):
                 self._autolabel_single_image(
                     image_paths[st.session_state.current_image_idx],
-                    class_names, conf, model
+                    class_names, conf, model, tiling, class_filter
                 )
         with col2:
+            near_duplicates = get_dataset_manifest().near_duplicates()
+            skip_near = bool(near_duplicates) and st.checkbox(
+                f"Skip {len(near_duplicates)} flagged near-duplicate frames", value=True
+            )
             if st.button("Label All Images"):
-                with st.spinner("Processing..."):
-                    for path in image_paths:
-                        self._autolabel_single_image(path, class_names, conf, model)
-                st.success("All images labeled.")
+                if skip_near:
+                    image_paths = [p for p in image_paths if Path(p).name not in near_duplicates]
+                self._start_labeling_job(image_paths, class_names, conf, model, tiling, class_filter)
+
+        self.render_job_status()
+
+    def render_model_source(self) -> Optional[str]:
+        """Return the weights path picked by upload or from MODELS_DIR"""
+        uploaded_model = st.file_uploader("Upload YOLOv8 `.pt` model", type=["pt"])
+        if uploaded_model:
+            # The uploader keeps returning the same file on every rerun
+            if st.session_state.get("uploaded_model_id") != uploaded_model.file_id:
+                st.session_state["uploaded_model_path"] = self.model_registry.save_upload(
+                    uploaded_model.name, uploaded_model.getbuffer()
+                )
+                st.session_state["uploaded_model_id"] = uploaded_model.file_id
+                st.success(f"Model uploaded: {uploaded_model.name}")
+            return st.session_state["uploaded_model_path"]
+
+        available = ModelUtils.get_available_models()
+        if not available:
+            return None
+        model_name = st.selectbox(
+            "Or choose a saved model",
+            options=available,
+            index=None,
+            placeholder="Models in the models directory",
+        )
+        return str(Config.MODELS_DIR / f"{model_name}.pt") if model_name else None
+
+    def render_tiling_settings(self) -> Dict:
+        """Tiled inference options; tile_size is None when tiling is off"""
+        with st.expander("Tiled inference (high-resolution images)"):
+            enabled = st.checkbox(
+                "Label in overlapping tiles",
+                help="Small objects in large frames are lost when the whole image is downscaled to the model input.",
+            )
+            tile_size = st.number_input("Tile size (px)", 128, 4096, Config.TILE_SIZE, 32, disabled=not enabled)
+            tile_overlap = st.slider("Tile overlap", 0.0, 0.5, Config.TILE_OVERLAP, 0.05, disabled=not enabled)
+            tile_batch_size = st.number_input(
+                "Tiles per batch", 1, 128, Config.TILE_BATCH_SIZE, disabled=not enabled
+            )
+        return {
+            "tile_size": int(tile_size) if enabled else None,
+            "tile_overlap": float(tile_overlap),
+            "tile_batch_size": int(tile_batch_size),
+        }
+
+    def render_job_status(self):
+        """Show progress of the background labeling job"""
+        job_id = st.session_state.get("autolabel_job_id")
+        job = self.job_runner.get(job_id) if job_id else None
+        if job is None:
+            return
+
+        st.progress(job.progress, text=f"Labeled {job.done} / {job.total}")
+        eta = f", ETA {job.eta:.0f}s" if job.eta is not None else ""
+        st.caption(f"Job `{job.job_id}`: {job.status}, {job.throughput:.1f} images/s{eta}")
+
+        if job.is_active:
+            if st.button("Cancel Labeling"):
+                job.cancel()
+        elif job.status == Job.COMPLETED:
+            st.success(f"All images labeled: {job.total - len(job.failed)} / {job.total}")
+            if st.session_state.pop("autolabel_refresh_annotations", False):
+                self.image_cache.clear_annotations()
+                self.session.clear()
+        elif job.status == Job.FAILED:
+            st.error(f"Labeling failed: {job.error}")
+        if job.status in (Job.CANCELLED, Job.FAILED):
+            if st.button("Resume Labeling"):
+                self.job_runner.resume(job.job_id)
+                st.rerun()
+        if job.failed:
+            st.warning("Could not read: " + ", ".join(Path(p).name for p in job.failed))
+
+    def _start_labeling_job(
+        self,
+        image_paths: List[str],
+        class_names: List[str],
+        conf_threshold: float,
+        model: YOLOModel,
+        tiling: Dict,
+        class_filter: Optional[List[str]] = None
+    ):
+        job_id = AutoLabelUtils.job_id(
+            model.model_hash or model.model_path, class_names, conf_threshold,
+            tiling["tile_size"], tiling["tile_overlap"], class_filter,
+        )
+        classes = list(class_names)
+        # Pending edits become human boxes, which labeling keeps
+        self.session.flush(write_annotations)
+        self.job_runner.submit(
+            job_id,
+            list(image_paths),
+            lambda items, cancel_event: AutoLabelUtils.label_images(
+                model, items, classes, conf_threshold, cancel_event,
+                store=self.annotation_store, cache=self.prediction_cache,
+                class_filter=class_filter, **tiling,
+            ),
+        )
+        st.session_state["autolabel_job_id"] = job_id
+        st.session_state["autolabel_refresh_annotations"] = True
 
     def _autolabel_single_image(
         self,
         image_path: str,
         class_names: List[str],
         conf_threshold: float,
-        model: YOLOModel
+        model: YOLOModel,
+        tiling: Dict,
+        class_filter: Optional[List[str]] = None
     ):
-        ann_path = self.file_utils.get_annotation_path(image_path)
-        preds = model.predict(image_path, conf_threshold)
-
-        filtered = []
-        for cls, x, y, w, h in preds:
-            model_classes = model.get_class_names()
-            if cls < len(model_classes):
-                name = model_classes[cls]
-                if name in class_names:
-                    filtered.append((class_names.index(name), x, y, w, h))
-
-        self.annotation_utils.write_yolo_annotation(ann_path, filtered)
+        self.session.flush(write_annotations)
+        for _ in AutoLabelUtils.label_images(
+            model, [image_path], class_names, conf_threshold,
+            store=self.annotation_store, cache=self.prediction_cache,
+            class_filter=class_filter, **tiling,
+        ):
+            pass
+        # The annotator reads the new boxes on its next render
+        self.image_cache.set_annotations(
+            image_path, self.annotation_store.get(FileUtils.get_image_id(image_path)) or []
+        )
+        self.session.discard(image_path)
         st.success(f"Labeled: {Path(image_path).name}")
@@ -0,0 +1,64 @@
+import pandas as pd
+import streamlit as st
+from typing import Dict, Optional
+
+from config import Config
+from utils.metrics import Metrics
+from components.resources import get_image_cache, get_model_registry
+
+
+class DebugPanelComponent:
+    """Sidebar with the timing breakdown of the rerun that just finished"""
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return Config.DEBUG_PANEL or st.query_params.get("debug") == "1"
+
+    @staticmethod
+    def record_gauges():
+        """Process gauges sampled once per rerun for the panel and the exports"""
+        cache = get_image_cache().stats()
+        Metrics.set_gauge("image_cache.hit_rate", cache["hit_rate"])
+        Metrics.set_gauge("image_cache.memory_bytes", cache["memory_mb"] * 1024 * 1024)
+        Metrics.set_gauge("image_cache.images", cache["images"])
+        Metrics.set_gauge("model_registry.memory_bytes", get_model_registry().memory_usage())
+
+    def render(self, rerun: Optional[Dict]):
+        if rerun is None:
+            return
+        with st.sidebar:
+            st.subheader("Profiling")
+            st.metric("Last rerun", f"{rerun['total'] * 1000:.0f} ms")
+            sections = rerun["sections"]
+            if sections:
+                # Nested sections (a decode inside a render) are counted in both rows
+                st.dataframe(
+                    pd.DataFrame(
+                        [(name, count, seconds * 1000) for name, (count, seconds) in sections.items()],
+                        columns=["section", "calls", "ms"],
+                    ).sort_values("ms", ascending=False),
+                    hide_index=True,
+                    use_container_width=True,
+                )
+            snapshot = Metrics.snapshot()
+            gauges, counters = snapshot["gauges"], snapshot["counters"]
+            st.caption(
+                f"Memory {gauges.get('memory_rss_bytes', 0) / 2**20:.0f} MB · "
+                f"image cache hit rate {gauges.get('image_cache.hit_rate', 0):.0%} · "
+                f"models {gauges.get('model_registry.memory_bytes', 0) / 2**20:.0f} MB"
+            )
+            hits, misses = counters.get("prediction_cache.hits", 0), counters.get("prediction_cache.misses", 0)
+            if hits or misses:
+                st.caption(f"Prediction cache: {hits:g} hits, {misses:g} misses")
+            timings = snapshot["timings"]
+            if timings:
+                with st.expander("Process totals"):
+                    st.dataframe(
+                        pd.DataFrame(
+                            [(name, t["count"], t["total"] * 1000 / t["count"], t["max"] * 1000)
+                             for name, t in timings.items()],
+                            columns=["section", "calls", "mean ms", "max ms"],
+                        ).sort_values("calls", ascending=False),
+                        hide_index=True,
+                        use_container_width=True,
+                    )
@@ -0,0 +1,125 @@
+import uuid
+from typing import Optional
+
+import streamlit as st
+
+from models.model_registry import ModelRegistry
+from utils.annotation_session import AnnotationSession
+from utils.annotation_store import AnnotationStore
+from utils.annotation_utils import AnnotationUtils
+from utils.dataset_manifest import DatasetManifest
+from utils.dataset_stats import DatasetStats
+from utils.file_utils import FileUtils
+from utils.image_cache import ImageCache
+from utils.job_runner import JobRunner
+from utils.lease_store import LeaseStore
+from utils.phash_utils import PHashIndex, PHashUtils
+from utils.prediction_cache import PredictionCache
+from utils.review_queue import ReviewQueue
+
+
+# Process-wide resources, created once and shared by all sessions and reruns
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """Job runner kept alive across script reruns"""
+    return JobRunner()
+
+
+@st.cache_resource
+def get_model_registry() -> ModelRegistry:
+    """Loaded models keyed by weights hash"""
+    return ModelRegistry()
+
+
+@st.cache_resource
+def get_annotation_store() -> AnnotationStore:
+    """Annotation index, synced with ANNOTATIONS_DIR on first use"""
+    store = AnnotationStore()
+    store.import_yolo_dir()
+    return store
+
+
+@st.cache_resource
+def get_image_cache() -> ImageCache:
+    """Decoded display images and annotations, prefetched around the current image"""
+    store = get_annotation_store()
+    return ImageCache(annotation_loader=lambda path: store.get(FileUtils.get_image_id(path)) or [])
+
+
+@st.cache_resource
+def get_dataset_manifest() -> DatasetManifest:
+    """Record of stored images with their size, dimensions and content hash"""
+    return DatasetManifest()
+
+
+@st.cache_resource
+def get_phash_index() -> PHashIndex:
+    """Perceptual hashes of stored images; images stored before hashing existed are hashed once here"""
+    manifest = get_dataset_manifest()
+    names = manifest.unhashed_names()
+    if names:
+        hashes = PHashUtils.hash_sources([manifest.get_path(name) for name in names])
+        manifest.set_phashes([(name, h, None) for name, h in zip(names, hashes) if h is not None])
+    return PHashIndex.build(manifest.phash_records())
+
+
+@st.cache_resource
+def get_prediction_cache() -> PredictionCache:
+    """Raw model predictions with confidences, reused when thresholds change"""
+    return PredictionCache()
+
+
+@st.cache_resource
+def get_review_queue() -> ReviewQueue:
+    """Unreviewed images by model uncertainty; call sync() to pick up new predictions"""
+    return ReviewQueue()
+
+
+@st.cache_resource
+def get_dataset_stats() -> DatasetStats:
+    """Dashboard aggregates, seeded from the store and updated on every label file write"""
+    stats = DatasetStats()
+    stats.load_rows(*get_annotation_store().all_boxes())
+    AnnotationUtils.add_write_listener(stats.on_write)
+    return stats
+
+
+@st.cache_resource
+def get_lease_store() -> LeaseStore:
+    """Image leases of all annotators, and label file versions for conflict checks"""
+    leases = LeaseStore()
+    AnnotationUtils.add_write_listener(leases.on_write)
+    return leases
+
+
+def get_lease_session_id() -> str:
+    """Lease owner id of this browser session"""
+    if "lease_session_id" not in st.session_state:
+        st.session_state.lease_session_id = uuid.uuid4().hex
+    return st.session_state.lease_session_id
+
+
+def get_annotation_session() -> AnnotationSession:
+    """Unsaved edits of the current browser session (per user, not shared)"""
+    if "annotation_session" not in st.session_state:
+        st.session_state.annotation_session = AnnotationSession()
+    return st.session_state.annotation_session
+
+
+def write_annotations(image_path: str, annotations, expected_version: Optional[int] = None) -> int:
+    """Session flush writer: store and file first, then the shared image cache.
+
+    Raises VersionConflict if the file was written since ``expected_version``;
+    returns the file's new version.
+    """
+    image_id = FileUtils.get_image_id(image_path)
+    leases = get_lease_store()
+    with leases.checked_write(image_id, expected_version):
+        get_annotation_store().write_edits(image_path, annotations)
+        version = leases.version(image_id)
+    get_image_cache().set_annotations(image_path, annotations)
+    get_review_queue().mark_reviewed(image_id)
+    # Saved by a person: never hand it out in another annotator's batch
+    leases.complete(get_lease_session_id(), [image_id], release=False)
+    return version
@@ -0,0 +1,61 @@
+import time
+import pandas as pd
+import streamlit as st
+from typing import List
+
+from utils.metrics import Metrics
+from components.resources import get_dataset_manifest, get_dataset_stats
+
+
+class StatsComponent:
+    def __init__(self):
+        # Creating the aggregates registers their write listener, so this has
+        # to happen before anything in the script writes a label file
+        self.stats = get_dataset_stats()
+        self.manifest = get_dataset_manifest()
+
+    @Metrics.timed("render.stats")
+    def render(self, class_names: List[str]):
+        st.header("Dataset Statistics")
+
+        if st.button("Recompute from label files"):
+            start = time.perf_counter()
+            with st.spinner("Reading label files..."):
+                files = self.stats.recompute()
+            st.caption(f"Re-read {files} label files in {time.perf_counter() - start:.2f}s")
+
+        snapshot = self.stats.snapshot(total_images=self.manifest.count())
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Images", snapshot["total_images"])
+        col2.metric("Labeled", f"{snapshot['labeled_fraction']:.0%}", f"{snapshot['unlabeled_images']} left", delta_color="off")
+        col3.metric("Boxes", snapshot["boxes"])
+        col4.metric("Boxes / image", f"{snapshot['mean_boxes_per_image']:.2f}")
+
+        counts = snapshot["class_counts"]
+        if counts.any():
+            st.subheader("Boxes per class")
+            labels = [
+                class_names[idx] if idx < len(class_names) else f"class {idx}"
+                for idx in range(len(counts))
+            ]
+            st.bar_chart(pd.DataFrame({"boxes": counts}, index=labels))
+
+        if snapshot["boxes"]:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.subheader("Box size")
+                edges = snapshot["size_edges"]
+                st.bar_chart(pd.DataFrame(
+                    {"boxes": snapshot["size_hist"]},
+                    index=[f"{lo:.2f}-{hi:.2f}" for lo, hi in zip(edges[:-1], edges[1:])],
+                ))
+                st.caption("√(w·h) relative to the image")
+            with col2:
+                st.subheader("Boxes per image")
+                per_image = snapshot["boxes_per_image_hist"]
+                last = len(per_image) - 1
+                st.bar_chart(pd.DataFrame(
+                    {"images": per_image},
+                    index=[str(n) if n < last else f"{n}+" for n in range(len(per_image))],
+                ))
@@ -1,11 +1,27 @@
 import streamlit as st
+from pathlib import Path
 from typing import List, Tuple
+from config import Config
 from utils.file_utils import FileUtils
+from utils.ingest_utils import IngestUtils
+from utils.annotation_store import AnnotationStore
+from utils.metrics import Metrics
+from components.resources import get_annotation_store, get_dataset_manifest, get_phash_index
+
+NEAR_DUPLICATE_MODES = {
+    "Flag": IngestUtils.NEAR_DUPLICATES_FLAG,
+    "Skip": IngestUtils.NEAR_DUPLICATES_SKIP,
+    "Keep all": IngestUtils.NEAR_DUPLICATES_KEEP,
+}
 
 class UploaderComponent:
     def __init__(self):
         self.file_utils = FileUtils()
+        self.manifest = get_dataset_manifest()
+        self.phash_index = get_phash_index()
+        self.annotation_store = get_annotation_store()
 
+    @Metrics.timed("render.uploader")
     def render(self) -> Tuple[bool, List[str]]:
         """Render file uploader and return (uploaded status, image paths)"""
         st.header("Upload Dataset")
@@ -16,15 +32,71 @@ class UploaderComponent:
             accept_multiple_files=True
         )
         
-        if uploaded_files:
+        col1, col2 = st.columns(2)
+        with col1:
+            mode = NEAR_DUPLICATE_MODES[st.radio(
+                "Near-duplicate frames", list(NEAR_DUPLICATE_MODES), horizontal=True,
+                help="Uploads that look almost the same as a stored image (perceptual hash).",
+            )]
+        with col2:
+            copy_labels = st.checkbox(
+                "Copy labels from the nearest labeled duplicate",
+                value=True, disabled=mode != IngestUtils.NEAR_DUPLICATES_FLAG,
+            )
+
+        # The uploader returns the same files on every rerun: ingest each one once
+        ingested = st.session_state.setdefault("ingested_file_ids", set())
+        new_files = [f for f in uploaded_files or [] if f.file_id not in ingested]
+        if new_files:
             with st.spinner("Saving uploaded files..."):
-                count, saved_paths = self.file_utils.save_uploaded_files(uploaded_files)
-            st.success(f"Saved {count} files to server")
-            return True, saved_paths
+                saved, duplicates, invalid, near = IngestUtils.ingest(
+                    new_files, self.manifest, phash_index=self.phash_index, near_duplicates=mode
+                )
+            ingested.update(f.file_id for f in new_files)
+            st.success(f"Saved {len(saved)} files to server")
+            if duplicates:
+                st.info(f"Skipped {len(duplicates)} files already in the dataset")
+            if near and mode == IngestUtils.NEAR_DUPLICATES_SKIP:
+                st.info(f"Skipped {len(near)} near-duplicate frames")
+            elif near:
+                copied = self._copy_labels(near) if copy_labels else 0
+                st.info(f"Flagged {len(near)} near-duplicate frames, copied labels to {copied}")
+            if invalid:
+                st.warning("Not valid images: " + ", ".join(invalid))
         
-        existing_images = self.file_utils.get_image_paths()
+        existing_images = self.manifest.image_paths()
         if existing_images:
-            st.info(f"Found {len(existing_images)} existing images in dataset")
-            return False, existing_images
+            if not uploaded_files:
+                st.info(f"Found {len(existing_images)} existing images in dataset")
+            self.render_browser()
+            return bool(new_files), existing_images
         
-        return False, []
\ No newline at end of file
+        return False, []
+
+    def _copy_labels(self, near) -> int:
+        """Give flagged frames the boxes of their closest labeled match"""
+        copied = 0
+        for name, matches in near:
+            for _, match in matches:
+                annotations = self.annotation_store.get(self.file_utils.get_image_id(match))
+                if annotations:
+                    self.annotation_store.write(
+                        self.manifest.get_path(name), annotations, source=AnnotationStore.SOURCE_COPIED
+                    )
+                    copied += 1
+                    break
+        return copied
+
+    def render_browser(self):
+        """Paged list of stored images, served from the manifest"""
+        if not st.checkbox("Browse images"):
+            return
+        total = self.manifest.count()
+        pages = max(1, -(-total // Config.BROWSE_PAGE_SIZE))
+        page = int(st.number_input("Page", min_value=1, max_value=pages, value=1))
+        offset = (page - 1) * Config.BROWSE_PAGE_SIZE
+        for path in self.manifest.page(offset, Config.BROWSE_PAGE_SIZE):
+            record = self.manifest.get(Path(path).name)
+            dims = f"{record['width']}×{record['height']}" if record and record["width"] else "?"
+            st.text(f"{Path(path).name}  {dims}")
+        st.caption(f"Page {page} / {pages}, {total} images")
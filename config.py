@@ -6,18 +6,97 @@ class Config:
     BASE_DIR = Path(__file__).parent.parent
     DATA_DIR = BASE_DIR / "data"
     UPLOADS_DIR = DATA_DIR / "uploads"
+    PYRAMID_DIR = DATA_DIR / "pyramid"
     ANNOTATIONS_DIR = DATA_DIR / "annotations"
     MODELS_DIR = DATA_DIR / "models"
+    JOBS_DIR = DATA_DIR / "jobs"
+    EXPORTS_DIR = DATA_DIR / "exports"
+    ANNOTATION_DB_PATH = DATA_DIR / "annotations.db"
+    CLASSES_PATH = DATA_DIR / "classes.txt"
+    MANIFEST_DB_PATH = DATA_DIR / "manifest.db"
+    PREDICTIONS_DB_PATH = DATA_DIR / "predictions.db"
+    LEASES_DB_PATH = DATA_DIR / "leases.db"
+    METRICS_DIR = DATA_DIR / "metrics"
     
     # Create directories if they don't exist
-    for dir_path in [UPLOADS_DIR, ANNOTATIONS_DIR, MODELS_DIR]:
+    for dir_path in [UPLOADS_DIR, PYRAMID_DIR, ANNOTATIONS_DIR, MODELS_DIR, JOBS_DIR, EXPORTS_DIR, METRICS_DIR]:
         dir_path.mkdir(parents=True, exist_ok=True)
     
     # Supported image extensions
     IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp", ".tiff"]
     
+    # Upload ingestion
+    INGEST_WORKERS = 8
+    BROWSE_PAGE_SIZE = 50
+    PHASH_RADIUS = 6  # perceptual hashes this many bits apart (of 64) are near-duplicates
+    
+    # Display resolution: the canvas never exceeds DISPLAY_MAX_SIZE on its longest side,
+    # downscaled copies for every pyramid level are cached in PYRAMID_DIR
+    DISPLAY_MAX_SIZE = 1280
+    PYRAMID_LEVELS = [2560, 1280, 640, 256]
+    
+    # Decoded image cache for navigation
+    IMAGE_CACHE_MAX_MB = 512
+    PREFETCH_RADIUS = 3  # images decoded ahead of and behind the current one
+    
+    # Edits are written when leaving an image or this many seconds after the last change
+    AUTOSAVE_DELAY = 3.0
+    
     # Annotation format
-    ANNOTATION_FORMAT = "yolo"  # Can be extended to other formats
+    ANNOTATION_FORMAT = "yolo"  # Storage format; training formats are produced by export
+    
+    # Batched auto-labeling
+    AUTOLABEL_BATCH_SIZE = 16
+    AUTOLABEL_DECODE_WORKERS = 4
+    AUTOLABEL_PREFETCH = 64
+    
+    # Tiled inference for high-resolution images
+    TILE_SIZE = 640  # pixels, square tiles cut from the full-resolution image
+    TILE_OVERLAP = 0.2  # fraction of the tile shared with its neighbour
+    TILE_BATCH_SIZE = 16  # tiles per model call
+    TILE_NMS_IOU = 0.5  # duplicates across tile seams are merged above this IoU
+    
+    # Raw predictions cached per (model, image) so thresholds can change without inference
+    PREDICTION_CACHE_MIN_CONF = 0.05  # inference keeps everything above this score
+    PREDICTION_MERGE_IOU = 0.5  # model boxes overlapping a human box of the same class are dropped
+    
+    # Active-learning review order
+    REVIEW_DISAGREEMENT_WEIGHT = 2.0  # weight of cross-model disagreement against box entropy
+    
+    # Loaded models shared across sessions
+    MODEL_CACHE_MAX_MB = 2048
+    
+    # Dataset export
+    EXPORT_STORED_EXTENSIONS = [".jpg", ".jpeg", ".png"]  # already compressed
+    EXPORT_SHARD_SIZE = 1000  # images per tar shard
+    EXPORT_DOWNLOAD_MAX_MB = 200  # archives are held in memory to download; larger ones are served from disk only
+    EXPORT_SPLITS = (0.8, 0.1, 0.1)  # train / val / test fractions of training-format exports
+    EXPORT_SPLIT_SEED = 0
+    EXPORT_WORKERS = 8
+    EXPORT_CHUNK_PER_WORKER = 64  # images converted per worker before results are written
+    
+    # Statistics dashboard
+    STATS_SIZE_BINS = 20  # histogram bins of sqrt(w * h), normalized box size
+    STATS_MAX_BOXES_PER_IMAGE = 50  # images with more boxes share the last bin
+    
+    # Class remapping
+    REMAP_WORKERS = 8
+    
+    # Instrumentation: section timings, per-rerun breakdowns and their export
+    METRICS_ENABLED = True
+    METRICS_PROM_PATH = METRICS_DIR / "annotator.prom"  # rewritten after every rerun
+    METRICS_EXPORT_PROMETHEUS = True
+    METRICS_JSON_LOG = METRICS_DIR / "reruns.jsonl"  # one line per rerun, grows without bound
+    METRICS_EXPORT_JSON = False
+    DEBUG_PANEL = os.environ.get("ANNOTATOR_DEBUG_PANEL") == "1"  # or open the app with ?debug=1
+    
+    # Several annotators on one server: each session leases a batch of images
+    LEASE_BATCH_SIZE = 20
+    LEASE_TTL = 900  # seconds; renewed on every rerun, expired leases return to the pool
+    
+    # Background jobs
+    JOB_WORKERS = 1
+    JOB_POLL_INTERVAL = 1.0  # seconds between status refreshes
     
     # Default colors for classes
     CLASS_COLORS = [
@@ -1,7 +1,13 @@
 import streamlit as st
+from streamlit_autorefresh import st_autorefresh
 from components.uploader import UploaderComponent
 from components.annotator import AnnotatorComponent
 from components.autolabel import AutoLabelComponent
+from components.stats import StatsComponent
+from components.debug_panel import DebugPanelComponent
+from components.resources import get_annotation_session, get_job_runner, write_annotations
+from config import Config
+from utils.metrics import Metrics
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Fix for ScriptRunContext warning
@@ -16,6 +22,42 @@ def main():
         layout="wide"
     )
     
+    # Time the whole page, autosave included
+    Metrics.begin_rerun()
+    render_app()
+    
+    # Autosave: write edits once they are AUTOSAVE_DELAY old, rerunning to get there
+    session = get_annotation_session()
+    if session.is_due(Config.AUTOSAVE_DELAY):
+        with Metrics.timer("autosave"):
+            session.flush(write_annotations)
+    autosave_in = session.seconds_until_due(Config.AUTOSAVE_DELAY)
+    
+    report_metrics()
+    
+    # Poll background jobs (labeling, export) until they finish and come back for
+    # the autosave. Browser-side timer: the script ends now, so a click is never held up
+    waits = [autosave_in]
+    if get_job_runner().has_active_jobs():
+        waits.append(Config.JOB_POLL_INTERVAL)
+    waits = [w for w in waits if w is not None]
+    if waits:
+        st_autorefresh(interval=max(100, int(min(waits) * 1000)), key="autorefresh")
+
+def report_metrics():
+    """Close the rerun's timings, export them and show the optional debug panel"""
+    if not Metrics.enabled:
+        return
+    DebugPanelComponent.record_gauges()
+    rerun = Metrics.end_rerun()
+    if Config.METRICS_EXPORT_PROMETHEUS:
+        Metrics.write_prometheus()
+    if Config.METRICS_EXPORT_JSON and rerun is not None:
+        Metrics.append_json_log(rerun)
+    if DebugPanelComponent.is_enabled():
+        DebugPanelComponent().render(rerun)
+
+def render_app():
     st.title("Dataset Annotation Tool")
     st.markdown("Annotate images for YOLOv8 training")
     
@@ -23,6 +65,7 @@ def main():
     uploader = UploaderComponent()
     annotator = AnnotatorComponent()
     autolabel = AutoLabelComponent()
+    stats = StatsComponent()
     
     # Initialize session state with default values
     session_defaults = {
@@ -39,8 +82,10 @@ def main():
     with st.expander("Upload Images", expanded=True):
         _, new_image_paths = uploader.render()
         # Always update session_state.image_paths when any images exist,
-        # whether newly uploaded or previously present on disk
-        if new_image_paths:
+        # whether newly uploaded or previously present on disk.
+        # The manifest returns the same list object while nothing changed.
+        if (new_image_paths and new_image_paths is not st.session_state.image_paths
+                and new_image_paths != st.session_state.image_paths):
             st.session_state.image_paths = new_image_paths
             st.session_state.current_image_idx = 0
     
@@ -49,6 +94,7 @@ def main():
         new_class_names = annotator.render_class_input()
         if new_class_names:
             st.session_state.class_names = new_class_names
+            annotator.render_class_remap(new_class_names)
         else:
             st.warning("Please enter at least one class name")
     
@@ -62,7 +108,7 @@ def main():
         return
     
     # Main tabs
-    tab1, tab2 = st.tabs(["Manual Annotation", "Auto-Labeling"])
+    tab1, tab2, tab3 = st.tabs(["Manual Annotation", "Auto-Labeling", "Statistics"])
     
     with tab1:
         annotator.render(
@@ -75,6 +121,9 @@ def main():
             st.session_state.class_names,
             st.session_state.image_paths
         )
+    
+    with tab3:
+        stats.render(st.session_state.class_names)
 
 if __name__ == "__main__":
     main()
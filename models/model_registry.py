@@ -0,0 +1,111 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from models.yolo_model import YOLOModel
+from utils.file_utils import FileUtils
+
+
+class ModelRegistry:
+    """LRU cache of loaded YOLO models keyed by the content hash of their weights.
+
+    Loaded models are shared by every session that asks for the same weights,
+    and the least recently used ones are dropped once their estimated memory
+    exceeds the budget.
+    """
+
+    def __init__(self, max_memory_mb: int = Config.MODEL_CACHE_MAX_MB, models_dir: Path = Config.MODELS_DIR):
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.models_dir = Path(models_dir)
+        self._models: "OrderedDict[str, YOLOModel]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._loading: Dict[str, Future] = {}  # key -> load in progress
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash_bytes(data) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def file_hash(self, model_path: str) -> str:
+        """Content hash of a weights file, memoized on (path, size, mtime)"""
+        stat = os.stat(model_path)
+        stat_key = (str(model_path), stat.st_size, stat.st_mtime_ns)
+        cached = self._hashes.get(stat_key)
+        if cached is not None:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        self._hashes[stat_key] = digest.hexdigest()
+        return self._hashes[stat_key]
+
+    def save_upload(self, file_name: str, data) -> str:
+        """Store uploaded weights in MODELS_DIR, skipping the write if unchanged"""
+        model_path = self.models_dir / Path(file_name).name
+        if model_path.exists() and model_path.stat().st_size == len(data):
+            if self.file_hash(str(model_path)) == self.hash_bytes(data):
+                return str(model_path)
+
+        # Two sessions may upload weights with the same file name at once
+        with FileUtils.atomic_write(model_path, "wb") as f:
+            f.write(data)
+        return str(model_path)
+
+    def get(self, model_path: str) -> YOLOModel:
+        """Return a loaded and warmed-up model, loading it on a cache miss.
+
+        Loading runs outside the registry lock, so other sessions' cache hits
+        never wait for it; concurrent requests for the same weights share
+        one load.
+        """
+        key = self.file_hash(model_path)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return loading.result()
+
+        try:
+            model = YOLOModel(str(model_path))
+            model.model_hash = key
+            model.warmup()
+            size = model.memory_bytes() or os.path.getsize(model_path)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(key, None)
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            self._models[key] = model
+            self._sizes[key] = size
+            self._evict(keep=key)
+            self._loading.pop(key, None)
+        loading.set_result(model)
+        return model
+
+    def memory_usage(self) -> int:
+        return sum(self._sizes.values())
+
+    def _evict(self, keep: Optional[str] = None):
+        while self.memory_usage() > self.max_memory_bytes and len(self._models) > 1:
+            key = next(iter(self._models))
+            if key == keep:
+                break
+            self._models.pop(key)
+            self._sizes.pop(key)
@@ -1,30 +1,242 @@
-from typing import List, Tuple, Optional
-import cv2
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 import numpy as np
 from pathlib import Path
-from ultralytics import YOLO
+
+from config import Config
+from utils.annotation_utils import AnnotationUtils
+from utils.metrics import Metrics
+from utils.tiling_utils import TilingUtils
 
 class YOLOModel:
     def __init__(self, model_path: str):
+        # Imported here: ultralytics pulls in torch, which headless tools should only pay for when needed
+        from ultralytics import YOLO
+
+        self.model_path = model_path
+        self.model_hash: Optional[str] = None  # weights hash, set by ModelRegistry
         self.model = YOLO(model_path)
+        # Jobs run on background threads while the UI may label a single image
+        self._lock = threading.Lock()
         self.class_names = self.model.names if hasattr(self.model, 'names') else []
 
-    def predict(self, image_path: str, conf_threshold: float = 0.5) -> List[Tuple[int, float, float, float, float]]:
+    def predict(
+        self,
+        image_path: str,
+        conf_threshold: float = 0.5,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = Config.TILE_OVERLAP,
+        tile_batch_size: int = Config.TILE_BATCH_SIZE,
+    ) -> List[Tuple[int, float, float, float, float]]:
         """Run prediction on an image and return YOLO format annotations"""
-        results = self.model(image_path, conf=conf_threshold)
+        return self.to_annotations(
+            self.predict_raw(image_path, conf_threshold, tile_size, tile_overlap, tile_batch_size)
+        )
+
+    @Metrics.timed("model.predict")
+    def predict_raw(
+        self,
+        image_path: str,
+        conf_threshold: float = 0.5,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = Config.TILE_OVERLAP,
+        tile_batch_size: int = Config.TILE_BATCH_SIZE,
+    ) -> np.ndarray:
+        """Predictions as an (N, 6) array of [class, confidence, xc, yc, w, h]"""
+        if tile_size:
+            import cv2
+
+            image = cv2.imread(str(image_path))
+            if image is None:
+                return np.zeros((0, 6), dtype=np.float32)
+            return self._predict_tiled_raw(image, conf_threshold, tile_size, tile_overlap, tile_batch_size)
+
+        with self._lock:
+            results = self.model(image_path, conf=conf_threshold, verbose=False)
         
-        annotations = []
         if results and len(results) > 0:
-            result = results[0]
-            if result.boxes is not None:
-                img_height, img_width = result.orig_shape
-                for box in result.boxes:
-                    class_id = int(box.cls)
-                    xywh = box.xywhn.cpu().numpy()[0]  # Normalized xywh
-                    annotations.append((class_id, xywh[0], xywh[1], xywh[2], xywh[3]))
-        
-        return annotations
+            return self._result_to_array(results[0])
+        return np.zeros((0, 6), dtype=np.float32)
+
+    def predict_batch(
+        self,
+        image_paths: List[str],
+        batch_size: int = Config.AUTOLABEL_BATCH_SIZE,
+        conf_threshold: float = 0.5,
+        num_workers: int = Config.AUTOLABEL_DECODE_WORKERS,
+        prefetch: int = Config.AUTOLABEL_PREFETCH,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = Config.TILE_OVERLAP,
+        tile_batch_size: int = Config.TILE_BATCH_SIZE,
+    ) -> Iterator[Tuple[str, Optional[List[Tuple[int, float, float, float, float]]]]]:
+        """Stream batched predictions as (image_path, annotations) pairs"""
+        for path, raw in self.predict_batch_raw(
+            image_paths, batch_size, conf_threshold, num_workers, prefetch,
+            tile_size, tile_overlap, tile_batch_size,
+        ):
+            yield path, None if raw is None else self.to_annotations(raw)
+
+    def predict_batch_raw(
+        self,
+        image_paths: List[str],
+        batch_size: int = Config.AUTOLABEL_BATCH_SIZE,
+        conf_threshold: float = 0.5,
+        num_workers: int = Config.AUTOLABEL_DECODE_WORKERS,
+        prefetch: int = Config.AUTOLABEL_PREFETCH,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = Config.TILE_OVERLAP,
+        tile_batch_size: int = Config.TILE_BATCH_SIZE,
+    ) -> Iterator[Tuple[str, Optional[np.ndarray]]]:
+        """Stream batched predictions as (image_path, (N, 6) array) pairs.
+
+        Images are decoded on worker threads into a bounded prefetch window
+        while the model runs on the previous batch. Images that fail to
+        decode are yielded with ``None`` instead of annotations. With
+        ``tile_size`` set, each image is labeled tile by tile instead and
+        ``tile_batch_size`` tiles go through the model per call.
+        """
+        batch_paths: List[str] = []
+        batch_images: List[np.ndarray] = []
+
+        for path, image in self._decode_stream(image_paths, num_workers, max(prefetch, batch_size)):
+            if image is None:
+                yield path, None
+                continue
+            if tile_size:
+                yield path, self._predict_tiled_raw(image, conf_threshold, tile_size, tile_overlap, tile_batch_size)
+                continue
+            batch_paths.append(path)
+            batch_images.append(image)
+            if len(batch_images) >= batch_size:
+                yield from self._run_batch(batch_paths, batch_images, conf_threshold)
+                batch_paths, batch_images = [], []
+
+        if batch_images:
+            yield from self._run_batch(batch_paths, batch_images, conf_threshold)
+
+    def predict_tiled(
+        self,
+        image: np.ndarray,
+        conf_threshold: float = 0.5,
+        tile_size: int = Config.TILE_SIZE,
+        tile_overlap: float = Config.TILE_OVERLAP,
+        tile_batch_size: int = Config.TILE_BATCH_SIZE,
+        iou_threshold: float = Config.TILE_NMS_IOU,
+    ) -> List[Tuple[int, float, float, float, float]]:
+        """Label a decoded image from overlapping full-resolution tiles.
+
+        Small objects keep their native pixel size instead of being
+        downscaled with the whole frame; boxes found twice on a tile seam
+        are merged with NMS.
+        """
+        return self.to_annotations(
+            self._predict_tiled_raw(image, conf_threshold, tile_size, tile_overlap, tile_batch_size, iou_threshold)
+        )
+
+    @staticmethod
+    def to_annotations(raw: np.ndarray) -> List[Tuple[int, float, float, float, float]]:
+        """(N, 6) prediction array -> YOLO annotation tuples, dropping confidences"""
+        return [
+            (int(cls), float(x), float(y), float(w), float(h))
+            for cls, _, x, y, w, h in raw.tolist()
+        ]
+
+    def _predict_tiled_raw(
+        self,
+        image: np.ndarray,
+        conf_threshold: float,
+        tile_size: int,
+        tile_overlap: float,
+        tile_batch_size: int,
+        iou_threshold: float = Config.TILE_NMS_IOU,
+    ) -> np.ndarray:
+        height, width = image.shape[:2]
+        windows = TilingUtils.tile_windows(width, height, tile_size, tile_overlap)
+
+        xyxy, scores, class_ids = [], [], []
+        for start in range(0, len(windows), tile_batch_size):
+            batch = windows[start:start + tile_batch_size]
+            tiles = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in batch]
+            with self._lock, Metrics.timer("model.predict_tiles"):
+                results = self.model(tiles, conf=conf_threshold, verbose=False)
+            for (x1, y1, _, _), result in zip(batch, results):
+                if result.boxes is None or len(result.boxes) == 0:
+                    continue
+                xyxy.append(result.boxes.xyxy.cpu().numpy() + np.array([x1, y1, x1, y1], dtype=np.float32))
+                scores.append(result.boxes.conf.cpu().numpy())
+                class_ids.append(result.boxes.cls.cpu().numpy().astype(int))
+        if not xyxy:
+            return np.zeros((0, 6), dtype=np.float32)
+
+        xyxy, scores, class_ids = np.concatenate(xyxy), np.concatenate(scores), np.concatenate(class_ids)
+        keep = TilingUtils.nms(xyxy, scores, class_ids, iou_threshold)
+        xywhn = AnnotationUtils.pixel_to_normalized(AnnotationUtils.xyxy_to_xywh(xyxy[keep]), width, height)
+        return np.column_stack([class_ids[keep], scores[keep], xywhn]).astype(np.float32)
+
+    def names_list(self) -> List[str]:
+        """Model class names indexed by model class id"""
+        names = self.class_names
+        if isinstance(names, dict):
+            return [names[idx] for idx in sorted(names)]
+        return list(names)
+
+    @staticmethod
+    def lookup_for_names(model_names: List[str], class_names: List[str]) -> Dict[int, int]:
+        project_ids = {name: idx for idx, name in enumerate(class_names)}
+        return {
+            model_id: project_ids[name]
+            for model_id, name in enumerate(model_names)
+            if name in project_ids
+        }
+
+    def warmup(self, image_size: int = 640):
+        """Run one dummy inference so the first real call pays no setup cost"""
+        dummy = np.zeros((image_size, image_size, 3), dtype=np.uint8)
+        with self._lock:
+            self.model(dummy, verbose=False)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the model weights"""
+        module = getattr(self.model, "model", None)
+        if module is None or not hasattr(module, "parameters"):
+            return 0
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
 
     def get_class_names(self) -> List[str]:
         """Get class names that model was trained on"""
-        return self.class_names
\ No newline at end of file
+        return self.class_names
+
+    def _run_batch(self, paths: List[str], images: List[np.ndarray], conf_threshold: float):
+        with self._lock, Metrics.timer("model.predict_batch"):
+            results = self.model(images, conf=conf_threshold, verbose=False)
+        for path, result in zip(paths, results):
+            yield path, self._result_to_array(result)
+
+    @staticmethod
+    def _decode_stream(image_paths: List[str], num_workers: int, prefetch: int):
+        """Decode images in order, keeping at most `prefetch` reads in flight"""
+        import cv2
+
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            pending = deque()
+            for path in image_paths:
+                pending.append((path, pool.submit(cv2.imread, str(path))))
+                if len(pending) >= prefetch:
+                    done_path, future = pending.popleft()
+                    yield done_path, future.result()
+            while pending:
+                done_path, future = pending.popleft()
+                yield done_path, future.result()
+
+    @staticmethod
+    def _result_to_array(result) -> np.ndarray:
+        if result.boxes is None or len(result.boxes) == 0:
+            return np.zeros((0, 6), dtype=np.float32)
+        return np.column_stack([
+            result.boxes.cls.cpu().numpy(),
+            result.boxes.conf.cpu().numpy(),
+            result.boxes.xywhn.cpu().numpy(),  # Normalized xywh
+        ]).astype(np.float32)
@@ -0,0 +1,161 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from utils.annotation_utils import AnnotationUtils
+from utils.file_utils import FileUtils
+from utils.lease_store import VersionConflict
+
+Annotations = List[Tuple[int, float, float, float, float]]
+
+
+class AnnotationSession:
+    """Working copy of a user's annotations, keyed by image id.
+
+    Edits land here first and only images whose boxes actually changed
+    are marked dirty. ``flush`` hands the dirty images to a writer in one
+    batch; callers flush on navigation and whenever ``is_due`` says the
+    last edit is older than the autosave delay. The file version an image
+    was loaded at goes to the writer, and a save refused with
+    VersionConflict is set aside in ``conflicts`` instead of retried.
+    """
+
+    # Normalized coordinates closer than this are the same box (well under a display pixel)
+    TOLERANCE = 1e-4
+
+    def __init__(self):
+        self._annotations: Dict[str, Annotations] = {}
+        self._dirty: Dict[str, str] = {}  # image_id -> image_path
+        self._versions: Dict[str, int] = {}  # image_id -> file version the working copy is based on
+        self.conflicts: Dict[str, str] = {}  # image_id -> image_path, edits made on a stale version
+        self._last_edit = 0.0
+        self._lock = threading.Lock()
+
+    def load(
+        self,
+        image_path: str,
+        loader: Callable[[str], Optional[Annotations]],
+        version: Optional[Callable[[str], int]] = None,
+    ) -> Annotations:
+        """Annotations of an image, read through ``loader`` only the first time.
+
+        ``version`` returns the image's current file version; it is read
+        before the annotations, so a concurrent write shows up as a conflict.
+        """
+        image_id = FileUtils.get_image_id(image_path)
+        with self._lock:
+            if image_id in self._annotations:
+                return self._annotations[image_id]
+        base_version = version(image_id) if version is not None else None
+        annotations = list(loader(image_path) or [])
+        with self._lock:
+            if image_id not in self._annotations and base_version is not None:
+                self._versions[image_id] = base_version
+            return self._annotations.setdefault(image_id, annotations)
+
+    def update(self, image_path: str, annotations: Annotations) -> bool:
+        """Record an edit; returns True if the boxes differ from the working copy"""
+        image_id = FileUtils.get_image_id(image_path)
+        with self._lock:
+            current = self._annotations.get(image_id)
+            if current is not None and self._same(current, annotations):
+                return False
+            self._annotations[image_id] = list(annotations)
+            self._dirty[image_id] = image_path
+            self._last_edit = time.time()
+            return True
+
+    def is_dirty(self, image_path: str) -> bool:
+        return FileUtils.get_image_id(image_path) in self._dirty
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def seconds_until_due(self, delay: float) -> Optional[float]:
+        """Time left before an autosave is due, or None if nothing is dirty"""
+        if not self._dirty:
+            return None
+        return max(0.0, self._last_edit + delay - time.time())
+
+    def is_due(self, delay: float) -> bool:
+        remaining = self.seconds_until_due(delay)
+        return remaining is not None and remaining == 0.0
+
+    def flush(self, writer: Callable[[str, Annotations, Optional[int]], Optional[int]]) -> int:
+        """Write every dirty image once; returns the number of files written.
+
+        The writer gets the base version and returns the new one.
+        """
+        with self._lock:
+            pending = [
+                (image_id, path, self._annotations[image_id], self._versions.get(image_id))
+                for image_id, path in self._dirty.items()
+            ]
+            self._dirty = {}
+        written = 0
+        done = 0
+        try:
+            for image_id, path, annotations, base_version in pending:
+                try:
+                    new_version = writer(path, annotations, base_version)
+                except VersionConflict:
+                    with self._lock:
+                        self.conflicts[image_id] = path
+                    done += 1
+                    continue
+                with self._lock:
+                    if new_version is not None:
+                        self._versions[image_id] = new_version
+                written += 1
+                done += 1
+        except Exception:
+            # Keep what was not written so the next flush retries it
+            with self._lock:
+                for image_id, path, _, _ in pending[done:]:
+                    self._dirty.setdefault(image_id, path)
+            raise
+        return written
+
+    def resolve_conflict(self, image_path: str, version: Optional[int] = None):
+        """Settle a conflict: with the current ``version`` the edits are saved over it on
+        the next flush; without one they are dropped and the image is re-read"""
+        image_id = FileUtils.get_image_id(image_path)
+        with self._lock:
+            self.conflicts.pop(image_id, None)
+            if version is None:
+                self._annotations.pop(image_id, None)
+                self._versions.pop(image_id, None)
+            else:
+                self._versions[image_id] = version
+                self._dirty[image_id] = image_path
+                self._last_edit = 0.0
+
+    def discard(self, image_path: str):
+        """Forget an image, including unsaved edits (deleted or relabeled elsewhere)"""
+        image_id = FileUtils.get_image_id(image_path)
+        with self._lock:
+            self._annotations.pop(image_id, None)
+            self._dirty.pop(image_id, None)
+            self._versions.pop(image_id, None)
+            self.conflicts.pop(image_id, None)
+
+    def clear(self):
+        """Drop every clean working copy so it is re-read from the store"""
+        with self._lock:
+            keep = set(self._dirty) | set(self.conflicts)
+            self._annotations = {
+                image_id: anns for image_id, anns in self._annotations.items() if image_id in keep
+            }
+            self._versions = {
+                image_id: version for image_id, version in self._versions.items() if image_id in keep
+            }
+
+    @staticmethod
+    def _same(a: Annotations, b: Annotations) -> bool:
+        if len(a) != len(b):
+            return False
+        if not a:
+            return True
+        a, b = AnnotationUtils.to_array(a), AnnotationUtils.to_array(b)
+        return bool(np.array_equal(a[:, 0], b[:, 0]) and np.allclose(a[:, 1:], b[:, 1:], atol=AnnotationSession.TOLERANCE))
@@ -0,0 +1,322 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from config import Config
+from utils.annotation_utils import AnnotationUtils
+from utils.file_utils import FileUtils
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    image_id TEXT PRIMARY KEY,
+    file_mtime REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS boxes (
+    image_id TEXT NOT NULL,
+    class_id INTEGER NOT NULL,
+    xc REAL NOT NULL,
+    yc REAL NOT NULL,
+    w REAL NOT NULL,
+    h REAL NOT NULL,
+    source TEXT NOT NULL,
+    confidence REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS boxes_image_idx ON boxes (image_id);
+CREATE INDEX IF NOT EXISTS boxes_class_idx ON boxes (class_id, image_id);
+"""
+
+
+class AnnotationStore:
+    """SQLite index of every box in the dataset.
+
+    The YOLO ``.txt`` files stay the exchange format; the store mirrors them
+    so dataset-wide queries do not have to open one file per image. An image
+    row means the image has an annotation file, possibly with no boxes.
+    """
+
+    SOURCE_MANUAL = "manual"
+    SOURCE_MODEL = "model"
+    SOURCE_IMPORTED = "imported"
+    SOURCE_COPIED = "copied"  # taken from a near-duplicate image
+
+    def __init__(self, db_path: Path = Config.ANNOTATION_DB_PATH):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        image_id: str,
+        annotations: List[Tuple[int, float, float, float, float]],
+        source: str = SOURCE_MANUAL,
+        confidences: Optional[List[float]] = None,
+        file_mtime: Optional[float] = None,
+    ):
+        """Replace all boxes of an image"""
+        now = time.time()
+        if confidences is None:
+            confidences = [None] * len(annotations)
+        rows = [
+            (image_id, int(cls), float(xc), float(yc), float(w), float(h), source, conf, now)
+            for (cls, xc, yc, w, h), conf in zip(annotations, confidences)
+        ]
+        with self._lock, self._conn:
+            self._replace(image_id, rows, file_mtime, now)
+
+    def write(
+        self,
+        image_path: str,
+        annotations: List[Tuple[int, float, float, float, float]],
+        source: str = SOURCE_MANUAL,
+        confidences: Optional[List[float]] = None,
+    ):
+        """Write the YOLO file of an image and index its boxes"""
+        ann_path = FileUtils.get_annotation_path(image_path)
+        AnnotationUtils.write_yolo_annotation(ann_path, annotations)
+        self.put(
+            FileUtils.get_image_id(image_path), annotations, source, confidences,
+            file_mtime=os.stat(ann_path).st_mtime,
+        )
+
+    def write_model_boxes(
+        self,
+        image_path: str,
+        annotations: List[Tuple[int, float, float, float, float]],
+        confidences: List[float],
+        iou_threshold: float = Config.PREDICTION_MERGE_IOU,
+    ) -> List[Tuple[int, float, float, float, float]]:
+        """Replace the model boxes of an image, keeping every human box.
+
+        Model boxes that overlap a kept box of the same class are dropped,
+        so re-labeling never duplicates what a person already drew or
+        confirmed. Returns the annotations written to the file.
+        """
+        image_id = FileUtils.get_image_id(image_path)
+        with self._lock:
+            kept = self._conn.execute(
+                "SELECT class_id, xc, yc, w, h, source, confidence FROM boxes "
+                "WHERE image_id = ? AND source != ? ORDER BY rowid",
+                (image_id, AnnotationStore.SOURCE_MODEL),
+            ).fetchall()
+
+        model_boxes = AnnotationUtils.to_array(annotations)
+        if kept and len(model_boxes):
+            kept_boxes = AnnotationUtils.to_array([row[:5] for row in kept])
+            overlap = AnnotationUtils.same_class_iou(model_boxes, kept_boxes) > iou_threshold
+            keep = ~overlap.any(axis=1)
+            model_boxes = model_boxes[keep]
+            confidences = [c for c, k in zip(confidences, keep) if k]
+
+        merged = [tuple(row[:5]) for row in kept] + AnnotationUtils.to_tuples(model_boxes)
+        ann_path = FileUtils.get_annotation_path(image_path)
+        AnnotationUtils.write_yolo_annotation(ann_path, merged)
+
+        now = time.time()
+        rows = [(image_id, *row, now) for row in kept] + [
+            (image_id, *box, AnnotationStore.SOURCE_MODEL, float(conf), now)
+            for box, conf in zip(AnnotationUtils.to_tuples(model_boxes), confidences)
+        ]
+        with self._lock, self._conn:
+            self._replace(image_id, rows, os.stat(ann_path).st_mtime, now)
+        return merged
+
+    def write_edits(self, image_path: str, annotations: List[Tuple[int, float, float, float, float]]):
+        """Save an edited image; boxes left untouched keep their source and confidence"""
+        image_id = FileUtils.get_image_id(image_path)
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT class_id, xc, yc, w, h, source, confidence FROM boxes WHERE image_id = ? ORDER BY rowid",
+                (image_id,),
+            ).fetchall()
+
+        sources = [AnnotationStore.SOURCE_MANUAL] * len(annotations)
+        confidences: List[Optional[float]] = [None] * len(annotations)
+        if previous and annotations:
+            new = AnnotationUtils.to_array(annotations)
+            old = AnnotationUtils.to_array([row[:5] for row in previous])
+            # Canvas round trips move coordinates by a fraction of a display pixel
+            same = (new[:, None, 0] == old[None, :, 0]) & (
+                np.abs(new[:, None, 1:] - old[None, :, 1:]).max(axis=2) < 1e-3
+            )
+            for i, j in zip(*np.nonzero(same)):
+                if sources[i] == AnnotationStore.SOURCE_MANUAL:
+                    sources[i], confidences[i] = previous[j][5], previous[j][6]
+
+        ann_path = FileUtils.get_annotation_path(image_path)
+        AnnotationUtils.write_yolo_annotation(ann_path, annotations)
+        now = time.time()
+        rows = [
+            (image_id, int(cls), float(xc), float(yc), float(w), float(h), source, conf, now)
+            for (cls, xc, yc, w, h), source, conf in zip(annotations, sources, confidences)
+        ]
+        with self._lock, self._conn:
+            self._replace(image_id, rows, os.stat(ann_path).st_mtime, now)
+
+    def get(self, image_id: str) -> Optional[List[Tuple[int, float, float, float, float]]]:
+        """Boxes of an image, or None if the image has no annotation yet"""
+        with self._lock:
+            if not self._conn.execute(
+                "SELECT 1 FROM images WHERE image_id = ?", (image_id,)
+            ).fetchone():
+                return None
+            return self._conn.execute(
+                "SELECT class_id, xc, yc, w, h FROM boxes WHERE image_id = ? ORDER BY rowid",
+                (image_id,),
+            ).fetchall()
+
+    def get_boxes(self, image_id: str) -> List[Dict]:
+        """Boxes of an image with their source, confidence and timestamp"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT class_id, xc, yc, w, h, source, confidence, updated_at "
+                "FROM boxes WHERE image_id = ? ORDER BY rowid",
+                (image_id,),
+            )
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def delete(self, image_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+            self._conn.execute("DELETE FROM images WHERE image_id = ?", (image_id,))
+
+    def images_with_class(self, class_id: int) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT image_id FROM boxes WHERE class_id = ? ORDER BY image_id",
+                (class_id,),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def labeled_image_ids(self) -> Set[str]:
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT image_id FROM images")}
+
+    def reviewed_image_ids(self) -> Set[str]:
+        """Images with at least one box drawn or corrected by a person"""
+        with self._lock:
+            return {
+                r[0] for r in self._conn.execute(
+                    "SELECT DISTINCT image_id FROM boxes WHERE source = ?", (AnnotationStore.SOURCE_MANUAL,)
+                )
+            }
+
+    def unlabeled_images(self, image_paths: Iterable[str]) -> List[str]:
+        """Image paths that have no annotation file yet"""
+        labeled = self.labeled_image_ids()
+        return [p for p in image_paths if Path(p).stem not in labeled]
+
+    def all_boxes(self) -> Tuple[List[str], List[Tuple]]:
+        """Every labeled image id and every (image_id, class_id, xc, yc, w, h) row"""
+        with self._lock:
+            image_ids = [r[0] for r in self._conn.execute("SELECT image_id FROM images")]
+            rows = self._conn.execute("SELECT image_id, class_id, xc, yc, w, h FROM boxes").fetchall()
+        return image_ids, rows
+
+    def class_counts(self) -> Dict[int, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT class_id, COUNT(*) FROM boxes GROUP BY class_id"
+            ).fetchall()
+        return dict(rows)
+
+    def remap_classes(self, mapping: Dict[int, Optional[int]], file_mtimes: Dict[str, float]):
+        """Apply a class remap (None deletes) and record the rewritten files' mtimes"""
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS remap (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+            self._conn.execute("DELETE FROM remap")
+            self._conn.executemany("INSERT INTO remap VALUES (?, ?)", list(mapping.items()))
+            self._conn.execute(
+                "DELETE FROM boxes WHERE class_id IN (SELECT old_id FROM remap WHERE new_id IS NULL)"
+            )
+            self._conn.execute(
+                "UPDATE boxes SET class_id = (SELECT new_id FROM remap WHERE old_id = boxes.class_id) "
+                "WHERE class_id IN (SELECT old_id FROM remap)"
+            )
+            self._conn.executemany(
+                "UPDATE images SET file_mtime = ? WHERE image_id = ?",
+                [(mtime, image_id) for image_id, mtime in file_mtimes.items()],
+            )
+
+    def import_yolo_dir(self, annotations_dir: Path = Config.ANNOTATIONS_DIR) -> int:
+        """Sync the store with YOLO `.txt` files, re-reading only changed ones"""
+        with self._lock:
+            known = dict(self._conn.execute("SELECT image_id, file_mtime FROM images"))
+
+        seen = set()
+        changed = []
+        with os.scandir(annotations_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".txt") or not entry.is_file():
+                    continue
+                image_id = entry.name[:-4]
+                seen.add(image_id)
+                mtime = entry.stat().st_mtime
+                if known.get(image_id) != mtime:
+                    changed.append((image_id, entry.path, mtime))
+
+        now = time.time()
+        parsed = []
+        for image_id, path, mtime in changed:
+            try:
+                annotations = AnnotationUtils.read_yolo_annotation(path)
+            except ValueError as e:
+                # One corrupt file must not keep the app from starting; it is retried on the next sync
+                logger.warning("Skipping unreadable label file %s: %s", path, e)
+                continue
+            rows = [
+                (image_id, cls, xc, yc, w, h, AnnotationStore.SOURCE_IMPORTED, None, now)
+                for cls, xc, yc, w, h in annotations
+            ]
+            parsed.append((image_id, rows, mtime))
+        with self._lock, self._conn:
+            for image_id, rows, mtime in parsed:
+                self._replace(image_id, rows, mtime, now)
+            for image_id in set(known) - seen:
+                self._conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+                self._conn.execute("DELETE FROM images WHERE image_id = ?", (image_id,))
+        return len(parsed)
+
+    def export_yolo_dir(self, annotations_dir: Path = Config.ANNOTATIONS_DIR) -> int:
+        """Write every indexed image back to YOLO `.txt` files"""
+        annotations_dir = Path(annotations_dir)
+        annotations_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            image_ids = [r[0] for r in self._conn.execute("SELECT image_id FROM images")]
+            rows = self._conn.execute(
+                "SELECT image_id, class_id, xc, yc, w, h FROM boxes ORDER BY image_id, rowid"
+            ).fetchall()
+
+        boxes: Dict[str, List[Tuple]] = {image_id: [] for image_id in image_ids}
+        for image_id, *box in rows:
+            boxes.setdefault(image_id, []).append(tuple(box))
+        for image_id, annotations in boxes.items():
+            AnnotationUtils.write_yolo_annotation(str(annotations_dir / f"{image_id}.txt"), annotations)
+        return len(boxes)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _replace(self, image_id: str, rows: List[Tuple], file_mtime: Optional[float], now: float):
+        self._conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+        self._conn.executemany(
+            "INSERT INTO boxes (image_id, class_id, xc, yc, w, h, source, confidence, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO images (image_id, file_mtime, updated_at) VALUES (?, ?, ?)",
+            (image_id, file_mtime, now),
+        )
@@ -1,34 +1,238 @@
-from typing import List, Dict, Tuple
-import cv2
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Callable, List, Dict, Optional, Tuple
 import numpy as np
 from pathlib import Path
 from config import Config
+from utils.file_utils import FileUtils
+from utils.metrics import Metrics
+
+logger = logging.getLogger(__name__)
 
 class AnnotationUtils:
+    # Called as listener(annotation_path, boxes) after every label file write,
+    # with boxes=None when the file is deleted
+    _write_listeners: List[Callable[[str, Optional[np.ndarray]], None]] = []
+
+    @staticmethod
+    def add_write_listener(listener: Callable[[str, Optional[np.ndarray]], None]):
+        if listener not in AnnotationUtils._write_listeners:
+            AnnotationUtils._write_listeners.append(listener)
+
     @staticmethod
+    def remove_write_listener(listener: Callable[[str, Optional[np.ndarray]], None]):
+        if listener in AnnotationUtils._write_listeners:
+            AnnotationUtils._write_listeners.remove(listener)
+
+    @staticmethod
+    def _notify(annotation_path: str, boxes: Optional[np.ndarray]):
+        for listener in list(AnnotationUtils._write_listeners):
+            listener(str(annotation_path), boxes)
+
+    @staticmethod
+    @Metrics.timed("labels.read")
     def read_yolo_annotation(annotation_path: str) -> List[Tuple[int, float, float, float, float]]:
         """Read YOLO format annotation file"""
-        annotations = []
-        if Path(annotation_path).exists():
-            with open(annotation_path, "r") as f:
-                for line in f.readlines():
-                    parts = line.strip().split()
-                    if len(parts) == 5:
-                        class_id, x_center, y_center, width, height = map(float, parts)
-                        annotations.append((int(class_id), x_center, y_center, width, height))
-        return annotations
+        return AnnotationUtils.to_tuples(AnnotationUtils.read_yolo_array(annotation_path, dtype=np.float64))
 
     @staticmethod
     def write_yolo_annotation(annotation_path: str, annotations: List[Tuple[int, float, float, float, float]]):
         """Write annotations in YOLO format"""
-        with open(annotation_path, "w") as f:
-            for ann in annotations:
-                f.write(f"{ann[0]} {ann[1]:.6f} {ann[2]:.6f} {ann[3]:.6f} {ann[4]:.6f}\n")
+        AnnotationUtils.write_yolo_array(annotation_path, AnnotationUtils.to_array(annotations))
+
+    # === Array-backed codec: annotations as an (N, 5) array of class, xc, yc, w, h ===
+
+    @staticmethod
+    def to_array(annotations, dtype=np.float32) -> np.ndarray:
+        """Convert a list of annotation tuples to an (N, 5) array"""
+        if len(annotations) == 0:
+            return np.zeros((0, 5), dtype=dtype)
+        return np.asarray(annotations, dtype=dtype).reshape(-1, 5)
+
+    @staticmethod
+    def to_tuples(boxes: np.ndarray) -> List[Tuple[int, float, float, float, float]]:
+        return [(int(row[0]), row[1], row[2], row[3], row[4]) for row in boxes.tolist()]
+
+    @staticmethod
+    def parse_yolo_array(text: str, dtype=np.float32) -> np.ndarray:
+        """Parse YOLO label text into an (N, 5) array, skipping malformed lines"""
+        rows, well_formed = AnnotationUtils._split_rows(text)
+        if not well_formed:
+            rows = [r for r in rows if len(r) == 5]
+        # Every remaining line has exactly five fields: one C-level conversion
+        return np.array(list(chain.from_iterable(rows)), dtype=dtype).reshape(-1, 5)
+
+    @staticmethod
+    def _split_rows(text: str) -> Tuple[List[List[str]], bool]:
+        """Fields of every non-empty line, and whether each line has exactly five"""
+        rows = [fields for fields in (line.split() for line in text.splitlines()) if fields]
+        return rows, all(len(fields) == 5 for fields in rows)
+
+    @staticmethod
+    def format_yolo_array(boxes: np.ndarray) -> str:
+        """Serialize an (N, 5) array to YOLO label text"""
+        if len(boxes) == 0:
+            return ""
+        boxes = np.asarray(boxes, dtype=np.float64)
+        # One format string for all rows: formatting runs in a single C call
+        return ("%d %.6f %.6f %.6f %.6f\n" * len(boxes)) % tuple(boxes.ravel().tolist())
+
+    @staticmethod
+    def read_yolo_array(annotation_path: str, dtype=np.float32) -> np.ndarray:
+        try:
+            with open(annotation_path, "r") as f:
+                return AnnotationUtils.parse_yolo_array(f.read(), dtype)
+        except FileNotFoundError:
+            return np.zeros((0, 5), dtype=dtype)
+
+    @staticmethod
+    @Metrics.timed("labels.write")
+    def write_yolo_array(annotation_path: str, boxes: np.ndarray):
+        """Write labels to a temp file and rename it, so readers never see a partial file.
+
+        The temp file name is unique: a labeling job and an autosave may
+        write the same label at once, and the last rename wins.
+        """
+        with FileUtils.atomic_write(annotation_path) as f:
+            f.write(AnnotationUtils.format_yolo_array(boxes))
+        AnnotationUtils._notify(annotation_path, boxes)
+
+    @staticmethod
+    def delete_yolo_annotation(annotation_path: str):
+        annotation_path = Path(annotation_path)
+        if annotation_path.exists():
+            annotation_path.unlink()
+            AnnotationUtils._notify(annotation_path, None)
+
+    @staticmethod
+    @Metrics.timed("labels.load_directory")
+    def load_directory(
+        annotations_dir: Optional[Path] = None,
+        max_workers: int = 8,
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Load every label file in a directory in one call.
+
+        Returns (image_ids, boxes, image_index): all boxes concatenated into one
+        (M, 5) float32 array, with image_index[i] pointing into image_ids.
+        """
+        annotations_dir = Path(annotations_dir or Config.ANNOTATIONS_DIR)
+        paths = sorted(p for p in annotations_dir.iterdir() if p.suffix == ".txt")
+
+        def read_text(path: Path) -> str:
+            with open(path, "r") as f:
+                return f.read()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            texts = list(pool.map(read_text, paths))
+
+        counts = np.zeros(len(paths), dtype=np.int64)
+        tokens: List[str] = []
+        fallback: Dict[int, str] = {}
+        for idx, text in enumerate(texts):
+            rows, well_formed = AnnotationUtils._split_rows(text)
+            if well_formed:
+                tokens.extend(chain.from_iterable(rows))
+                counts[idx] = len(rows)
+            else:
+                fallback[idx] = text
+        try:
+            boxes = np.array(tokens, dtype=np.float32).reshape(-1, 5)
+        except ValueError:
+            # A non-numeric token somewhere: parse every file on its own
+            boxes = np.zeros((0, 5), dtype=np.float32)
+            counts[:] = 0
+            fallback = dict(enumerate(texts))
+
+        parsed: Dict[int, np.ndarray] = {}
+        for idx, text in fallback.items():
+            try:
+                parsed[idx] = AnnotationUtils.parse_yolo_array(text)
+            except ValueError as e:
+                logger.warning("Skipping unreadable label file %s: %s", paths[idx], e)
+                continue
+            counts[idx] = len(parsed[idx])
+        if fallback:
+            # Splice separately parsed files back in file order
+            parts, start = [boxes[:0]], 0
+            for idx, count in enumerate(counts):
+                if idx in parsed:
+                    parts.append(parsed[idx])
+                elif idx not in fallback:
+                    parts.append(boxes[start:start + count])
+                    start += count
+            boxes = np.concatenate(parts).astype(np.float32, copy=False)
+        keep = [idx for idx in range(len(paths)) if idx not in fallback or idx in parsed]
+        image_ids = [paths[idx].stem for idx in keep]
+        image_index = np.repeat(np.arange(len(keep)), counts[keep])
+        return image_ids, boxes, image_index
+
+    @staticmethod
+    def save_directory(
+        annotations_dir: Path,
+        image_ids: List[str],
+        boxes: np.ndarray,
+        image_index: np.ndarray,
+        max_workers: int = 8,
+    ):
+        """Write one label file per image id from concatenated boxes (inverse of load_directory)"""
+        annotations_dir = Path(annotations_dir)
+        annotations_dir.mkdir(parents=True, exist_ok=True)
+        order = np.argsort(image_index, kind="stable")
+        boxes, image_index = boxes[order], image_index[order]
+        bounds = np.searchsorted(image_index, np.arange(len(image_ids) + 1))
+
+        def write(idx: int):
+            AnnotationUtils.write_yolo_array(
+                str(annotations_dir / f"{image_ids[idx]}.txt"), boxes[bounds[idx]:bounds[idx + 1]]
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(write, range(len(image_ids))))
+
+    # === Vectorized coordinate conversions on (N, 4) box arrays ===
+
+    @staticmethod
+    def normalized_to_pixel(boxes: np.ndarray, width: float, height: float) -> np.ndarray:
+        return np.asarray(boxes, dtype=np.float32) * np.array([width, height, width, height], dtype=np.float32)
+
+    @staticmethod
+    def pixel_to_normalized(boxes: np.ndarray, width: float, height: float) -> np.ndarray:
+        return np.asarray(boxes, dtype=np.float32) / np.array([width, height, width, height], dtype=np.float32)
+
+    @staticmethod
+    def xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+        """(center x, center y, w, h) -> (x1, y1, x2, y2)"""
+        boxes = np.asarray(boxes, dtype=np.float32)
+        half = boxes[:, 2:4] / 2
+        return np.concatenate([boxes[:, 0:2] - half, boxes[:, 0:2] + half], axis=1)
+
+    @staticmethod
+    def xyxy_to_xywh(boxes: np.ndarray) -> np.ndarray:
+        """(x1, y1, x2, y2) -> (center x, center y, w, h)"""
+        boxes = np.asarray(boxes, dtype=np.float32)
+        size = boxes[:, 2:4] - boxes[:, 0:2]
+        return np.concatenate([boxes[:, 0:2] + size / 2, size], axis=1)
+
+    @staticmethod
+    def same_class_iou(boxes: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """(N, M) IoU between YOLO box arrays, zero across different classes"""
+        a = AnnotationUtils.xywh_to_xyxy(boxes[:, 1:])
+        b = AnnotationUtils.xywh_to_xyxy(others[:, 1:])
+        ix = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+        iy = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+        inter = ix * iy
+        area_a = (boxes[:, 3] * boxes[:, 4])[:, None]
+        area_b = (others[:, 3] * others[:, 4])[None, :]
+        iou = inter / np.maximum(area_a + area_b - inter, 1e-9)
+        return np.where(boxes[:, None, 0] == others[None, :, 0], iou, 0.0)
 
     @staticmethod
     def draw_bboxes(image: np.ndarray, annotations: List[Tuple[int, float, float, float, float]], 
                    class_names: List[str]) -> np.ndarray:
         """Draw bounding boxes on image with class labels"""
+        import cv2
+
         if image is None:
             return None
             
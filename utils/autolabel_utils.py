@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from config import Config
+from models.yolo_model import YOLOModel
+from utils.file_utils import FileUtils
+from utils.annotation_utils import AnnotationUtils
+from utils.annotation_store import AnnotationStore
+from utils.prediction_cache import PredictionCache
+from utils.metrics import Metrics
+
+
+class AutoLabelUtils:
+    @staticmethod
+    def job_id(
+        model_key: str,
+        class_names: List[str],
+        conf_threshold: float,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = Config.TILE_OVERLAP,
+        class_filter: Optional[List[str]] = None,
+    ) -> str:
+        """Stable id for a labeling run, so a restarted run resumes its checkpoint"""
+        key = f"{model_key}|{','.join(class_names)}|{conf_threshold:.4f}"
+        if tile_size:
+            key += f"|tiles:{tile_size}:{tile_overlap:.3f}"
+        if class_filter is not None:
+            key += f"|only:{','.join(sorted(class_filter))}"
+        return "autolabel_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def class_lookup(
+        model_names: List[str], class_names: List[str], class_filter: Optional[List[str]] = None
+    ) -> Dict[int, int]:
+        """Model -> project class ids, limited to ``class_filter`` names when given"""
+        lookup = YOLOModel.lookup_for_names(model_names, class_names)
+        if class_filter is None:
+            return lookup
+        allowed = {class_names.index(name) for name in class_filter if name in class_names}
+        return {model_id: project_id for model_id, project_id in lookup.items() if project_id in allowed}
+
+    @staticmethod
+    def materialize(
+        image_path: str,
+        raw: np.ndarray,
+        class_lookup: Dict[int, int],
+        conf_threshold: float,
+        store: Optional[AnnotationStore] = None
+    ) -> List[Tuple[int, float, float, float, float]]:
+        """Threshold raw predictions, map them to project classes and write them.
+
+        With a store, human boxes of the image are kept and only the model
+        boxes are replaced; without one the annotation file is overwritten.
+        """
+        model_classes = raw[:, 0].astype(np.int64)
+        keep = (raw[:, 1] >= conf_threshold) & np.isin(model_classes, list(class_lookup))
+        kept = raw[keep]
+        project_classes = [class_lookup[int(cls)] for cls in model_classes[keep]]
+        annotations = AnnotationUtils.to_tuples(np.column_stack([project_classes, kept[:, 2:]]))
+        if store is not None:
+            return store.write_model_boxes(image_path, annotations, kept[:, 1].tolist())
+        AnnotationUtils.write_yolo_annotation(FileUtils.get_annotation_path(image_path), annotations)
+        return annotations
+
+    @staticmethod
+    def label_images(
+        model,
+        image_paths: List[str],
+        class_names: List[str],
+        conf_threshold: float,
+        cancel_event: Optional[threading.Event] = None,
+        batch_size: int = Config.AUTOLABEL_BATCH_SIZE,
+        store: Optional[AnnotationStore] = None,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = Config.TILE_OVERLAP,
+        tile_batch_size: int = Config.TILE_BATCH_SIZE,
+        cache: Optional[PredictionCache] = None,
+        class_filter: Optional[List[str]] = None,
+    ) -> Iterator[Tuple[str, bool]]:
+        """Label images in batches, yielding (image_path, ok) as each one is written.
+
+        Images with cached predictions for this model are re-thresholded
+        without inference; the rest are predicted down to
+        PREDICTION_CACHE_MIN_CONF and cached, so the next threshold or
+        class filter change is cheap.
+        """
+        class_lookup = AutoLabelUtils.class_lookup(model.names_list(), class_names, class_filter)
+        model_hash = model.model_hash or model.model_path
+        model_key = PredictionCache.model_key(model_hash, tile_size, tile_overlap)
+        infer_conf = min(conf_threshold, Config.PREDICTION_CACHE_MIN_CONF)
+
+        cached = {}
+        if cache is not None:
+            cache.put_model_names(model_hash, model.names_list())
+            cached = cache.get_many(model_key, image_paths, conf_threshold)
+        for path, raw in cached.items():
+            AutoLabelUtils.materialize(path, raw, class_lookup, conf_threshold, store)
+            yield path, True
+            if cancel_event is not None and cancel_event.is_set():
+                return
+
+        misses = [p for p in image_paths if p not in cached]
+        Metrics.increment("prediction_cache.hits", len(cached))
+        Metrics.increment("prediction_cache.misses", len(misses))
+        for path, raw in model.predict_batch_raw(
+            misses, batch_size=batch_size, conf_threshold=infer_conf,
+            tile_size=tile_size, tile_overlap=tile_overlap, tile_batch_size=tile_batch_size,
+        ):
+            if raw is None:
+                yield path, False
+            else:
+                if cache is not None:
+                    cache.put(model_key, path, raw, infer_conf)
+                AutoLabelUtils.materialize(path, raw, class_lookup, conf_threshold, store)
+                yield path, True
+            if cancel_event is not None and cancel_event.is_set():
+                return
@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+import numpy as np
+from config import Config
+from utils.annotation_utils import AnnotationUtils
+from utils.file_utils import FileUtils
+from utils.image_utils import ImageUtils
+
+SizeLookup = Callable[[str], Optional[Tuple[int, int]]]
+
+
+class ConvertUtils:
+    """Training-format exports (YOLO + data.yaml, COCO JSON, Pascal VOC) with splits.
+
+    Labels are read once with ``AnnotationUtils.load_directory``; image
+    sizes come from the manifest or a header-only read. Images are
+    converted in parallel chunks and every file is written straight into
+    a temp directory that is renamed when complete.
+    """
+
+    FORMAT_YOLO = "yolo"
+    FORMAT_COCO = "coco"
+    FORMAT_VOC = "voc"
+    FORMATS = (FORMAT_YOLO, FORMAT_COCO, FORMAT_VOC)
+    SPLIT_NAMES = ("train", "val", "test")
+
+    @staticmethod
+    def stratified_split(
+        class_sets: Sequence[np.ndarray], fractions: Sequence[float] = Config.EXPORT_SPLITS, seed: int = Config.EXPORT_SPLIT_SEED
+    ) -> np.ndarray:
+        """Split index (0=train, 1=val, 2=test) per image, stratified by class.
+
+        Each image is grouped by the rarest class it contains (images without
+        boxes form their own group), so rare classes land in every split.
+        Each group is shuffled and cut by ``fractions``.
+        """
+        n = len(class_sets)
+        splits = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return splits
+        all_classes = np.concatenate([c for c in class_sets if len(c)] or [np.zeros(0, np.int64)])
+        frequency = np.bincount(all_classes) if len(all_classes) else np.zeros(0, np.int64)
+        strata = np.array(
+            [int(c[np.argmin(frequency[c])]) if len(c) else -1 for c in class_sets], dtype=np.int64
+        )
+
+        fractions = np.asarray(fractions, dtype=np.float64)
+        bounds = np.cumsum(fractions / fractions.sum())
+        rng = np.random.default_rng(seed)
+        for stratum in np.unique(strata):
+            members = rng.permutation(np.flatnonzero(strata == stratum))
+            # Positions are centred in their slot, so a group of one goes to train
+            position = (np.arange(len(members)) + 0.5) / len(members)
+            splits[members] = np.minimum(np.searchsorted(bounds, position), len(bounds) - 1)
+        return splits
+
+    @staticmethod
+    def target_dir(
+        export_format: str, dataset_hash: str, class_names: List[str], fractions: Sequence[float], seed: int
+    ) -> Path:
+        """Cached export location; class names are part of the key since every format embeds them"""
+        key = hashlib.sha1(
+            json.dumps([list(class_names), list(fractions), seed], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:8]
+        return Config.EXPORTS_DIR / f"{export_format}_{dataset_hash}_{key}"
+
+    @staticmethod
+    def export(
+        image_paths: List[str],
+        export_format: str,
+        class_names: List[str],
+        target: Path,
+        fractions: Sequence[float] = Config.EXPORT_SPLITS,
+        seed: int = Config.EXPORT_SPLIT_SEED,
+        size_lookup: Optional[SizeLookup] = None,
+        annotations_dir: Optional[Path] = None,
+        max_workers: int = Config.EXPORT_WORKERS,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[Tuple[str, bool]]:
+        """Convert labeled images into ``target``, yielding (image path, ok) as each is written"""
+        if export_format not in ConvertUtils.FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        target = Path(target)
+        if target.exists():
+            for image_path in image_paths:
+                yield image_path, True
+            return
+
+        image_ids, boxes, image_index = AnnotationUtils.load_directory(annotations_dir)
+        position = {image_id: i for i, image_id in enumerate(image_ids)}
+        per_image = np.split(boxes[np.argsort(image_index, kind="stable")],
+                             np.cumsum(np.bincount(image_index, minlength=len(image_ids)))[:-1]) if image_ids else []
+        labeled = [p for p in image_paths if FileUtils.get_image_id(p) in position]
+        for image_path in image_paths:
+            if FileUtils.get_image_id(image_path) not in position:
+                yield image_path, False
+        image_boxes = [per_image[position[FileUtils.get_image_id(p)]] for p in labeled]
+        splits = ConvertUtils.stratified_split(
+            [np.unique(b[:, 0].astype(np.int64)) for b in image_boxes], fractions, seed
+        )
+
+        # Unique and hidden from _remove_stale: a CLI and a UI export may run at once
+        tmp_dir = FileUtils.temp_dir_for(target)
+        writer = _WRITERS[export_format](tmp_dir, class_names)
+        lookup = size_lookup or (lambda image_path: None)
+
+        def convert(item: Tuple[str, np.ndarray, int]):
+            image_path, image_boxes_, split = item
+            try:
+                size = lookup(image_path) or ImageUtils.get_image_size(image_path)
+                return writer.write_image(image_path, image_boxes_, size, ConvertUtils.SPLIT_NAMES[split])
+            except OSError:
+                return None
+
+        completed = False
+        try:
+            items = list(zip(labeled, image_boxes, splits.tolist()))
+            chunk = max_workers * Config.EXPORT_CHUNK_PER_WORKER
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for start in range(0, len(items), chunk):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    batch = items[start:start + chunk]
+                    for (image_path, _, split), record in zip(batch, pool.map(convert, batch)):
+                        if record is not None:
+                            writer.add_record(ConvertUtils.SPLIT_NAMES[split], record)
+                        yield image_path, record is not None
+            writer.close()
+            completed = True
+        finally:
+            writer.abort()
+            if completed:
+                ConvertUtils._remove_stale(export_format)
+                os.replace(tmp_dir, target)
+            else:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def place_image(image_path: str, target: Path):
+        """Hard-link the image into the export, copying across file systems"""
+        try:
+            os.link(image_path, target)
+        except OSError:
+            shutil.copy2(image_path, target)
+
+    @staticmethod
+    def _remove_stale(export_format: str):
+        """Keep only the newest export of each format"""
+        for stale in Config.EXPORTS_DIR.glob(f"{export_format}_*"):
+            if stale.is_dir():
+                shutil.rmtree(stale, ignore_errors=True)
+
+
+class _YoloWriter:
+    """images/<split>/, labels/<split>/ and a data.yaml for ultralytics"""
+
+    def __init__(self, root: Path, class_names: List[str]):
+        self.root = root
+        self.class_names = class_names
+        self.used_splits = set()
+        for split in ConvertUtils.SPLIT_NAMES:
+            (root / "images" / split).mkdir(parents=True)
+            (root / "labels" / split).mkdir(parents=True)
+
+    def write_image(self, image_path: str, boxes: np.ndarray, size: Tuple[int, int], split: str):
+        name = Path(image_path).name
+        ConvertUtils.place_image(image_path, self.root / "images" / split / name)
+        with open(self.root / "labels" / split / f"{Path(name).stem}.txt", "w") as f:
+            f.write(AnnotationUtils.format_yolo_array(boxes))
+        return split
+
+    def add_record(self, split: str, record):
+        self.used_splits.add(split)
+
+    def close(self):
+        # No "path:" key: ultralytics then resolves the splits next to this file
+        lines = []
+        for split in ConvertUtils.SPLIT_NAMES:
+            if split in self.used_splits:
+                lines.append(f"{split}: images/{split}")
+        lines.append(f"nc: {len(self.class_names)}")
+        lines.append("names:")
+        lines.extend(f"  {idx}: {json.dumps(name, ensure_ascii=False)}" for idx, name in enumerate(self.class_names))
+        with open(self.root / "data.yaml", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def abort(self):
+        pass
+
+
+class _CocoWriter:
+    """images/<split>/ and annotations/instances_<split>.json, one JSON stream per split.
+
+    Image and annotation entries are serialized by the workers; the
+    writing thread only assigns ids and appends text, so no split's JSON
+    is ever held in memory as a whole.
+    """
+
+    def __init__(self, root: Path, class_names: List[str]):
+        self.root = root
+        self.categories = [
+            {"id": idx + 1, "name": name, "supercategory": "none"} for idx, name in enumerate(class_names)
+        ]
+        (root / "annotations").mkdir()
+        self.streams: Dict[str, dict] = {}
+        for split in ConvertUtils.SPLIT_NAMES:
+            (root / "images" / split).mkdir(parents=True)
+
+    def write_image(self, image_path: str, boxes: np.ndarray, size: Tuple[int, int], split: str):
+        name = Path(image_path).name
+        ConvertUtils.place_image(image_path, self.root / "images" / split / name)
+        width, height = size
+        pixel = AnnotationUtils.normalized_to_pixel(boxes[:, 1:], width, height)
+        corners = AnnotationUtils.xywh_to_xyxy(pixel)
+        annotations = [
+            {"category_id": int(cls) + 1, "bbox": [round(x, 2), round(y, 2), round(w, 2), round(h, 2)],
+             "area": round(w * h, 2), "iscrowd": 0}
+            for cls, (x, y), (w, h) in zip(boxes[:, 0].tolist(), corners[:, :2].tolist(), pixel[:, 2:].tolist())
+        ]
+        return {"file_name": f"{split}/{name}", "width": int(width), "height": int(height)}, annotations
+
+    def add_record(self, split: str, record):
+        stream = self.streams.get(split)
+        if stream is None:
+            stream = self._open(split)
+        image, annotations = record
+        stream["image_id"] += 1
+        image = dict(image, id=stream["image_id"])
+        stream["images"].write(("," if stream["image_id"] > 1 else "") + json.dumps(image, ensure_ascii=False))
+        for annotation in annotations:
+            stream["ann_id"] += 1
+            annotation = dict(annotation, id=stream["ann_id"], image_id=stream["image_id"])
+            stream["annotations"].write(("," if stream["ann_id"] > 1 else "") + json.dumps(annotation))
+
+    def _open(self, split: str) -> dict:
+        # Annotations go to a side file and are appended after the image list on close
+        path = self.root / "annotations" / f"instances_{split}.json"
+        images = open(path, "w", encoding="utf-8")
+        images.write('{"info": {"description": "exported dataset"}, "images": [')
+        stream = {
+            "path": path,
+            "images": images,
+            "annotations": open(path.with_suffix(".annotations.tmp"), "w", encoding="utf-8"),
+            "image_id": 0,
+            "ann_id": 0,
+        }
+        self.streams[split] = stream
+        return stream
+
+    def close(self):
+        for stream in self.streams.values():
+            stream["annotations"].close()
+            images = stream["images"]
+            images.write('], "annotations": [')
+            side_path = stream["path"].with_suffix(".annotations.tmp")
+            with open(side_path, "r", encoding="utf-8") as side:
+                shutil.copyfileobj(side, images)
+            side_path.unlink()
+            images.write('], "categories": ' + json.dumps(self.categories, ensure_ascii=False) + "}")
+            images.close()
+        self.streams = {}
+
+    def abort(self):
+        for stream in self.streams.values():
+            stream["images"].close()
+            stream["annotations"].close()
+        self.streams = {}
+
+
+class _VocWriter:
+    """Pascal VOC: JPEGImages/, Annotations/<stem>.xml and ImageSets/Main/<split>.txt"""
+
+    def __init__(self, root: Path, class_names: List[str]):
+        self.root = root
+        self.class_names = class_names
+        for sub in ("JPEGImages", "Annotations", "ImageSets/Main"):
+            (root / sub).mkdir(parents=True)
+        self.split_files: Dict[str, object] = {}
+
+    def write_image(self, image_path: str, boxes: np.ndarray, size: Tuple[int, int], split: str):
+        name = Path(image_path).name
+        ConvertUtils.place_image(image_path, self.root / "JPEGImages" / name)
+        width, height = size
+        corners = AnnotationUtils.xywh_to_xyxy(AnnotationUtils.normalized_to_pixel(boxes[:, 1:], width, height))
+        corners = np.clip(np.rint(corners), 0, [width, height, width, height]).astype(np.int64)
+        objects = "".join(
+            "<object><name>{}</name><pose>Unspecified</pose><truncated>0</truncated><difficult>0</difficult>"
+            "<bndbox><xmin>{}</xmin><ymin>{}</ymin><xmax>{}</xmax><ymax>{}</ymax></bndbox></object>".format(
+                escape(self._class_name(int(cls))), *box
+            )
+            for cls, box in zip(boxes[:, 0].tolist(), corners.tolist())
+        )
+        xml = (
+            f"<annotation><folder>JPEGImages</folder><filename>{escape(name)}</filename>"
+            f"<size><width>{width}</width><height>{height}</height><depth>3</depth></size>"
+            f"<segmented>0</segmented>{objects}</annotation>\n"
+        )
+        with open(self.root / "Annotations" / f"{Path(name).stem}.xml", "w", encoding="utf-8") as f:
+            f.write(xml)
+        return Path(name).stem
+
+    def _class_name(self, class_id: int) -> str:
+        return self.class_names[class_id] if class_id < len(self.class_names) else f"class{class_id}"
+
+    def add_record(self, split: str, record):
+        if split not in self.split_files:
+            self.split_files[split] = open(self.root / "ImageSets" / "Main" / f"{split}.txt", "w", encoding="utf-8")
+        self.split_files[split].write(record + "\n")
+
+    def close(self):
+        self.abort()
+
+    def abort(self):
+        for f in self.split_files.values():
+            f.close()
+        self.split_files = {}
+
+
+_WRITERS = {
+    ConvertUtils.FORMAT_YOLO: _YoloWriter,
+    ConvertUtils.FORMAT_COCO: _CocoWriter,
+    ConvertUtils.FORMAT_VOC: _VocWriter,
+}
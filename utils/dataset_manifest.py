@@ -0,0 +1,200 @@
+import bisect
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from PIL import Image
+from config import Config
+from utils.metrics import Metrics
+from utils.phash_utils import PHashUtils
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    hash TEXT,
+    phash INTEGER,
+    near_duplicate_of TEXT
+);
+CREATE INDEX IF NOT EXISTS images_hash_idx ON images (hash);
+"""
+
+# Columns added after the first release, created on databases that predate them
+_ADDED_COLUMNS = {"phash": "INTEGER", "near_duplicate_of": "TEXT"}
+
+
+class DatasetManifest:
+    """Persistent record of every image in UPLOADS_DIR.
+
+    Keyed by file name; stores size, mtime, dimensions and content hash so
+    the app does not have to re-read images to know about them. The sorted
+    image list is kept in memory and only rescanned when the directory
+    mtime changes; the rescan probes only new or modified files.
+    """
+
+    COLUMNS = ("name", "size", "mtime", "width", "height", "hash")
+
+    def __init__(self, db_path: Path = Config.MANIFEST_DB_PATH, images_dir: Path = Config.UPLOADS_DIR):
+        self.db_path = Path(db_path)
+        self.images_dir = Path(images_dir)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(images)")}
+        for column, declaration in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE images ADD COLUMN {column} {declaration}")
+        self._lock = threading.Lock()
+        # Shared by every session: only one of them rescans a changed directory
+        self._refresh_lock = threading.Lock()
+        self._stats: Dict[str, Tuple[int, float]] = {
+            name: (size, mtime)
+            for name, size, mtime in self._conn.execute("SELECT name, size, mtime FROM images")
+        }
+        self._names: List[str] = sorted(self._stats)
+        self._paths: List[str] = [self.get_path(name) for name in self._names]
+        self._dir_mtime: Optional[int] = None
+
+    @Metrics.timed("manifest.refresh")
+    def refresh(self, force: bool = False) -> bool:
+        """Sync with the images directory if it changed; returns True if rescanned"""
+        dir_mtime = os.stat(self.images_dir).st_mtime_ns
+        if not force and dir_mtime == self._dir_mtime:
+            return False
+        with self._refresh_lock:
+            if not force and dir_mtime == self._dir_mtime:
+                return False  # another session rescanned while this one waited
+            return self._rescan(dir_mtime)
+
+    def _rescan(self, dir_mtime: int) -> bool:
+        extensions = tuple(Config.IMAGE_EXTENSIONS)
+        seen = {}
+        with os.scandir(self.images_dir) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(extensions) and entry.is_file():
+                    stat = entry.stat()
+                    seen[entry.name] = (stat.st_size, stat.st_mtime)
+
+        changed = []
+        for name, (size, mtime) in seen.items():
+            if self._stats.get(name) != (size, mtime):
+                width, height = self._probe_size(self.images_dir / name)
+                changed.append((name, size, mtime, width, height, None))
+        removed = [name for name in self._stats if name not in seen]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO images (name, size, mtime, width, height, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                changed,
+            )
+            self._conn.executemany("DELETE FROM images WHERE name = ?", [(n,) for n in removed])
+            if changed or removed:
+                self._stats = seen
+                self._names = sorted(seen)
+                self._paths = [self.get_path(name) for name in self._names]
+            self._dir_mtime = dir_mtime
+        return True
+
+    def image_paths(self) -> List[str]:
+        """Sorted image paths; the same list object is returned while nothing changes"""
+        self.refresh()
+        return self._paths
+
+    def count(self) -> int:
+        self.refresh()
+        return len(self._paths)
+
+    def page(self, offset: int, limit: int) -> List[str]:
+        self.refresh()
+        return self._paths[offset:offset + limit]
+
+    def add_many(self, records: Iterable[Tuple[str, int, float, Optional[int], Optional[int], Optional[str]]]):
+        """Insert or update (name, size, mtime, width, height, hash) records"""
+        records = list(records)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO images (name, size, mtime, width, height, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            new_names = [r[0] for r in records if r[0] not in self._stats]
+            for name, size, mtime, *_ in records:
+                self._stats[name] = (size, mtime)
+            if new_names:
+                self._names = sorted(self._names + new_names)
+                self._paths = [self.get_path(name) for name in self._names]
+
+    def get(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, size, mtime, width, height, hash FROM images WHERE name = ?", (name,)
+            ).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row else None
+
+    def find_by_hash(self, content_hash: str) -> Optional[str]:
+        """Name of a stored image with this content, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name FROM images WHERE hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_phashes(self, items: Iterable[Tuple[str, int, Optional[str]]]):
+        """Record (name, perceptual hash, name of the image it nearly duplicates or None)"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE images SET phash = ?, near_duplicate_of = ? WHERE name = ?",
+                [(PHashUtils.to_signed(phash), dup_of, name) for name, phash, dup_of in items],
+            )
+
+    def phash_records(self) -> List[Tuple[str, int]]:
+        """(name, perceptual hash) of every image that has been hashed"""
+        with self._lock:
+            rows = self._conn.execute("SELECT name, phash FROM images WHERE phash IS NOT NULL").fetchall()
+        return [(name, PHashUtils.to_unsigned(value)) for name, value in rows]
+
+    def unhashed_names(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT name FROM images WHERE phash IS NULL")]
+
+    def near_duplicates(self) -> Dict[str, str]:
+        """Flagged image name -> the earlier image it nearly duplicates"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT name, near_duplicate_of FROM images WHERE near_duplicate_of IS NOT NULL"
+            ))
+
+    def remove(self, name: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM images WHERE name = ?", (name,))
+            if self._stats.pop(name, None) is not None:
+                idx = bisect.bisect_left(self._names, name)
+                self._names = self._names[:idx] + self._names[idx + 1:]
+                self._paths = self._paths[:idx] + self._paths[idx + 1:]
+
+    def get_path(self, name: str) -> str:
+        return str(self.images_dir / name)
+
+    def image_size(self, name: str) -> Optional[Tuple[int, int]]:
+        record = self.get(name)
+        if record is None or record["width"] is None:
+            return None
+        return record["width"], record["height"]
+
+    def names(self) -> List[str]:
+        self.refresh()
+        return self._names
+
+    @staticmethod
+    def _probe_size(path: Path) -> Tuple[Optional[int], Optional[int]]:
+        try:
+            with Image.open(path) as img:
+                return img.size
+        except Exception:
+            return None, None
@@ -0,0 +1,119 @@
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config import Config
+from utils.annotation_utils import AnnotationUtils
+
+
+class DatasetStats:
+    """Running aggregates over every label file in a directory.
+
+    Per-class box counts, a box size histogram and a boxes-per-image
+    histogram are kept as small arrays. ``on_write`` (registered as an
+    AnnotationUtils write listener) subtracts an image's previous boxes and
+    adds the new ones, so keeping the aggregates current costs
+    O(boxes in the file) and reading them costs O(bins).
+    """
+
+    def __init__(
+        self,
+        annotations_dir: Path = Config.ANNOTATIONS_DIR,
+        size_bins: int = Config.STATS_SIZE_BINS,
+        max_boxes: int = Config.STATS_MAX_BOXES_PER_IMAGE,
+    ):
+        self.annotations_dir = Path(annotations_dir).resolve()
+        self.size_edges = np.linspace(0.0, 1.0, size_bins + 1)
+        self.max_boxes = max_boxes
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._boxes: Dict[str, np.ndarray] = {}  # image_id -> (N, 5) boxes currently counted
+        self._class_counts = np.zeros(0, dtype=np.int64)
+        self._size_hist = np.zeros(len(self.size_edges) - 1, dtype=np.int64)
+        self._per_image_hist = np.zeros(self.max_boxes + 1, dtype=np.int64)
+        self._total_boxes = 0
+
+    def on_write(self, annotation_path: str, boxes: Optional[np.ndarray]):
+        """Write listener: account for a rewritten (or deleted, boxes=None) label file"""
+        path = Path(annotation_path)
+        if path.parent.resolve() != self.annotations_dir:
+            return  # exports and scratch directories are not the dataset
+        self.update(path.stem, boxes)
+
+    def update(self, image_id: str, boxes: Optional[np.ndarray]):
+        with self._lock:
+            previous = self._boxes.pop(image_id, None)
+            if previous is not None:
+                self._apply(previous, -1)
+            if boxes is not None:
+                boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 5)
+                self._boxes[image_id] = boxes
+                self._apply(boxes, 1)
+
+    def _apply(self, boxes: np.ndarray, sign: int):
+        classes = boxes[:, 0].astype(np.int64)
+        if len(classes):
+            needed = int(classes.max()) + 1
+            if needed > len(self._class_counts):
+                self._class_counts = np.pad(self._class_counts, (0, needed - len(self._class_counts)))
+            self._class_counts += sign * np.bincount(classes, minlength=len(self._class_counts))
+        self._size_hist += sign * np.histogram(self._box_sizes(boxes), bins=self.size_edges)[0]
+        self._per_image_hist[min(len(boxes), self.max_boxes)] += sign
+        self._total_boxes += sign * len(boxes)
+
+    def load(self, image_ids: List[str], boxes: np.ndarray, image_index: np.ndarray):
+        """Replace all aggregates from concatenated boxes in one vectorized pass"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 5)
+        image_index = np.asarray(image_index, dtype=np.int64)
+        per_image = np.bincount(image_index, minlength=len(image_ids))
+        order = np.argsort(image_index, kind="stable")
+        split = np.split(boxes[order], np.cumsum(per_image)[:-1]) if len(image_ids) else []
+        with self._lock:
+            self._reset()
+            self._boxes = dict(zip(image_ids, split))
+            if len(boxes):
+                self._class_counts = np.bincount(boxes[:, 0].astype(np.int64))
+            self._size_hist = np.histogram(self._box_sizes(boxes), bins=self.size_edges)[0].astype(np.int64)
+            self._per_image_hist = np.bincount(
+                np.minimum(per_image, self.max_boxes), minlength=self.max_boxes + 1
+            ).astype(np.int64)
+            self._total_boxes = len(boxes)
+
+    def load_rows(self, image_ids: Iterable[str], rows: List[Tuple]):
+        """Seed from (image_id, class, xc, yc, w, h) rows, e.g. the annotation store"""
+        ids = list(dict.fromkeys(list(image_ids) + [r[0] for r in rows]))
+        position = {image_id: i for i, image_id in enumerate(ids)}
+        image_index = np.array([position[r[0]] for r in rows], dtype=np.int64)
+        boxes = np.array([r[1:] for r in rows], dtype=np.float32).reshape(-1, 5)
+        self.load(ids, boxes, image_index)
+
+    def recompute(self) -> int:
+        """Re-read every label file (vectorized); returns the number of files"""
+        image_ids, boxes, image_index = AnnotationUtils.load_directory(self.annotations_dir)
+        self.load(image_ids, boxes, image_index)
+        return len(image_ids)
+
+    def snapshot(self, total_images: Optional[int] = None) -> Dict:
+        """Copy of the aggregates; labeled_fraction needs the dataset's image count"""
+        with self._lock:
+            labeled = len(self._boxes)
+            snapshot = {
+                "labeled_images": labeled,
+                "boxes": self._total_boxes,
+                "class_counts": self._class_counts.copy(),
+                "size_edges": self.size_edges,
+                "size_hist": self._size_hist.copy(),
+                "boxes_per_image_hist": self._per_image_hist.copy(),
+                "mean_boxes_per_image": self._total_boxes / labeled if labeled else 0.0,
+            }
+        if total_images is not None:
+            snapshot["total_images"] = total_images
+            snapshot["unlabeled_images"] = max(0, total_images - labeled)
+            snapshot["labeled_fraction"] = labeled / total_images if total_images else 0.0
+        return snapshot
+
+    @staticmethod
+    def _box_sizes(boxes: np.ndarray) -> np.ndarray:
+        return np.sqrt(np.clip(boxes[:, 3] * boxes[:, 4], 0.0, 1.0))
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import shutil
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+from config import Config
+from utils.file_utils import FileUtils
+
+
+class _Cancelled(Exception):
+    """Raised inside an export's atomic write to discard the partial file"""
+
+
+class ExportUtils:
+    @staticmethod
+    def collect_files(image_paths: Iterable[str], labeled_ids: Set[str]) -> List[str]:
+        """Images followed by their label file, for images that have one"""
+        files = []
+        for image_path in image_paths:
+            files.append(str(image_path))
+            if FileUtils.get_image_id(image_path) in labeled_ids:
+                files.append(FileUtils.get_annotation_path(image_path))
+        return files
+
+    @staticmethod
+    def arcname(file_path: str) -> str:
+        name = Path(file_path).name
+        return f"labels/{name}" if name.endswith(".txt") else f"images/{name}"
+
+    @staticmethod
+    def manifest_hash(files: List[str]) -> str:
+        """Hash of names, sizes and mtimes: changes whenever the dataset does"""
+        digest = hashlib.sha1()
+        for file_path in files:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            digest.update(f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def zip_path(dataset_hash: str) -> Path:
+        return Config.EXPORTS_DIR / f"dataset_{dataset_hash}.zip"
+
+    @staticmethod
+    def shards_dir(dataset_hash: str, shard_size: int) -> Path:
+        return Config.EXPORTS_DIR / f"shards_{dataset_hash}_{shard_size}"
+
+    @staticmethod
+    def write_zip(
+        files: List[str],
+        dataset_hash: str,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[Tuple[str, bool]]:
+        """Stream files into a zip on disk, yielding (file, ok) as each is added.
+
+        JPEG/PNG are already compressed and are stored as is. The archive is
+        written to a temp file and renamed, so an existing one is always complete.
+        """
+        target = ExportUtils.zip_path(dataset_hash)
+        if target.exists():
+            for file_path in files:
+                yield file_path, True
+            return
+
+        try:
+            with FileUtils.atomic_write(target, "wb") as f:
+                with zipfile.ZipFile(f, "w", allowZip64=True) as zipf:
+                    for file_path in files:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise _Cancelled
+                        if not os.path.exists(file_path):
+                            yield file_path, False
+                            continue
+                        zipf.write(
+                            file_path,
+                            arcname=ExportUtils.arcname(file_path),
+                            compress_type=ExportUtils._compress_type(file_path),
+                        )
+                        yield file_path, True
+                ExportUtils._remove_stale("dataset_*.zip")
+        except _Cancelled:
+            return
+
+    @staticmethod
+    def write_tar_shards(
+        files: List[str],
+        dataset_hash: str,
+        shard_size: int = Config.EXPORT_SHARD_SIZE,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[Tuple[str, bool]]:
+        """Write tar shards of `shard_size` images each, labels next to their image"""
+        target = ExportUtils.shards_dir(dataset_hash, shard_size)
+        if target.exists():
+            for file_path in files:
+                yield file_path, True
+            return
+
+        # Unique and hidden from _remove_stale: a CLI and a UI export may run at once
+        tmp_dir = FileUtils.temp_dir_for(target)
+        completed = False
+        shard = None
+        images_in_shard = 0
+        shard_idx = 0
+        try:
+            for file_path in files:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                is_label = file_path.endswith(".txt")
+                if not is_label and (shard is None or images_in_shard >= shard_size):
+                    if shard is not None:
+                        shard.close()
+                    shard = tarfile.open(tmp_dir / f"shard-{shard_idx:06d}.tar", "w")
+                    shard_idx += 1
+                    images_in_shard = 0
+                if shard is None or not os.path.exists(file_path):
+                    yield file_path, False
+                    continue
+                shard.add(file_path, arcname=Path(file_path).name)
+                if not is_label:
+                    images_in_shard += 1
+                yield file_path, True
+            completed = True
+        finally:
+            if shard is not None:
+                shard.close()
+            if completed:
+                ExportUtils._remove_stale(f"shards_*_{shard_size}")
+                os.replace(tmp_dir, target)
+            else:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _compress_type(file_path: str) -> int:
+        if Path(file_path).suffix.lower() in Config.EXPORT_STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    @staticmethod
+    def _remove_stale(pattern: str):
+        """Keep only the newest cached export of each kind"""
+        for stale in Config.EXPORTS_DIR.glob(pattern):
+            if stale.is_dir():
+                shutil.rmtree(stale, ignore_errors=True)
+            else:
+                stale.unlink(missing_ok=True)
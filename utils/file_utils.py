@@ -1,27 +1,41 @@
 import os
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Tuple
+from typing import IO, Iterator, List, Optional, Tuple
 from config import Config
+from utils.metrics import Metrics
+
+# mkstemp and mkdtemp create owner-only entries; finished files get what open() would give them
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
 
 class FileUtils:
     @staticmethod
     def save_uploaded_files(uploaded_files) -> Tuple[int, List[str]]:
-        """Save uploaded files to server and return count and paths"""
-        saved_paths = []
-        for uploaded_file in uploaded_files:
-            file_path = Config.UPLOADS_DIR / uploaded_file.name
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            saved_paths.append(str(file_path))
-        return len(saved_paths), saved_paths
+        """Save uploaded files to server and return count of new files and all their paths"""
+        from utils.dataset_manifest import DatasetManifest
+        from utils.ingest_utils import IngestUtils
+
+        saved_paths, duplicate_paths, _, _ = IngestUtils.ingest(uploaded_files, DatasetManifest())
+        return len(saved_paths), saved_paths + duplicate_paths
 
     @staticmethod
+    @Metrics.timed("files.list_images")
     def get_image_paths() -> List[str]:
         """Get all image paths from uploads directory"""
-        image_paths = []
-        for ext in Config.IMAGE_EXTENSIONS:
-            image_paths.extend(Config.UPLOADS_DIR.glob(f"*{ext}"))
-        return sorted([str(p) for p in image_paths])
+        extensions = tuple(Config.IMAGE_EXTENSIONS)
+        with os.scandir(Config.UPLOADS_DIR) as entries:
+            image_paths = [
+                entry.path for entry in entries
+                if entry.name.lower().endswith(extensions) and entry.is_file()
+            ]
+        return sorted(image_paths)
+
+    @staticmethod
+    def get_image_id(image_path: str) -> str:
+        """Stable image id shared by the image and its annotation file"""
+        return Path(image_path).stem
 
     @staticmethod
     def get_annotation_path(image_path: str) -> str:
@@ -30,6 +44,34 @@ class FileUtils:
         annotation_path = Config.ANNOTATIONS_DIR / f"{image_path.stem}.txt"
         return str(annotation_path)
 
+    @staticmethod
+    @contextmanager
+    def atomic_write(path, mode: str = "w") -> Iterator[IO]:
+        """Write to a unique temp file next to ``path`` and rename it over ``path`` on success.
+
+        Readers never see a partial file, and concurrent writers of the same
+        path never share a temp file: the last rename wins. On an error the
+        temp file is removed and ``path`` is left as it was.
+        """
+        path = Path(path)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            os.fchmod(fd, 0o666 & ~_UMASK)
+            with os.fdopen(fd, mode) as f:
+                yield f
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def temp_dir_for(path) -> Path:
+        """Unique hidden directory next to ``path`` to build it in before renaming it into place"""
+        path = Path(path)
+        tmp_dir = Path(tempfile.mkdtemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"))
+        os.chmod(tmp_dir, 0o777 & ~_UMASK)
+        return tmp_dir
+
     @staticmethod
     def delete_image_and_annotation(image_path: str):
         """Delete image and its annotation"""
@@ -37,6 +79,19 @@ class FileUtils:
         if image_path.exists():
             image_path.unlink()
         
-        annotation_path = Config.ANNOTATIONS_DIR / f"{image_path.stem}.txt"
-        if annotation_path.exists():
-            annotation_path.unlink()
\ No newline at end of file
+        from utils.annotation_utils import AnnotationUtils
+
+        AnnotationUtils.delete_yolo_annotation(Config.ANNOTATIONS_DIR / f"{image_path.stem}.txt")
+
+    @staticmethod
+    def load_class_names() -> Optional[List[str]]:
+        """Class list the annotation files were written with, if saved"""
+        if not Config.CLASSES_PATH.exists():
+            return None
+        with open(Config.CLASSES_PATH, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    @staticmethod
+    def save_class_names(class_names: List[str]):
+        with open(Config.CLASSES_PATH, "w") as f:
+            f.write("\n".join(class_names) + "\n")
@@ -0,0 +1,137 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+from PIL import Image
+from config import Config
+from utils.image_utils import ImageUtils
+
+
+class ImageCache:
+    """LRU cache of decoded display images with background prefetching.
+
+    Entries are bounded by their decoded size in bytes. A single daemon thread
+    decodes the neighbours of the current image, so Previous/Next usually hit
+    the cache. Annotations of prefetched images are cached alongside.
+    """
+
+    def __init__(
+        self,
+        max_memory_mb: int = Config.IMAGE_CACHE_MAX_MB,
+        prefetch_radius: int = Config.PREFETCH_RADIUS,
+        annotation_loader: Optional[Callable[[str], List[Tuple]]] = None,
+    ):
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.prefetch_radius = prefetch_radius
+        self.annotation_loader = annotation_loader
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self._images: "OrderedDict[str, Tuple[float, Image.Image, Tuple[int, int]]]" = OrderedDict()
+        self._annotations: Dict[str, List[Tuple]] = {}
+        self._memory = 0
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = threading.Thread(target=self._prefetch_loop, name="image-prefetch", daemon=True)
+        self._worker.start()
+
+    def get(self, image_path: str) -> Tuple[Image.Image, Tuple[int, int]]:
+        """Return (display image, native size), decoding on a miss"""
+        mtime = os.stat(image_path).st_mtime
+        with self._lock:
+            entry = self._images.get(image_path)
+            if entry is not None and entry[0] == mtime:
+                self._images.move_to_end(image_path)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        image, native_size = ImageUtils.load_display_image(image_path)
+        self._put(image_path, mtime, image, native_size)
+        return image, native_size
+
+    def get_annotations(self, image_path: str) -> Optional[List[Tuple]]:
+        """Prefetched annotations of an image, or None if not cached"""
+        with self._lock:
+            return self._annotations.get(image_path)
+
+    def set_annotations(self, image_path: str, annotations: List[Tuple]):
+        """Keep cached annotations in sync after a save"""
+        with self._lock:
+            self._annotations[image_path] = annotations
+
+    def clear_annotations(self):
+        with self._lock:
+            self._annotations.clear()
+
+    def invalidate(self, image_path: str):
+        with self._lock:
+            entry = self._images.pop(image_path, None)
+            if entry is not None:
+                self._memory -= self._image_bytes(entry[1])
+            self._annotations.pop(image_path, None)
+
+    def prefetch(self, image_paths: List[str], current_idx: int):
+        """Queue neighbours of current_idx, nearest first, replacing older requests"""
+        order = []
+        for offset in range(1, self.prefetch_radius + 1):
+            for idx in (current_idx + offset, current_idx - offset):
+                if 0 <= idx < len(image_paths):
+                    order.append(image_paths[idx])
+        with self._wakeup:
+            self._pending.clear()
+            self._pending.extend(order)
+            self._wakeup.notify()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "prefetched": self.prefetched,
+                "images": len(self._images),
+                "memory_mb": self._memory / (1024 * 1024),
+            }
+
+    def _prefetch_loop(self):
+        while True:
+            with self._wakeup:
+                while not self._pending:
+                    self._wakeup.wait()
+                image_path = self._pending.popleft()
+                cached = image_path in self._images
+                need_annotations = self.annotation_loader is not None and image_path not in self._annotations
+
+            try:
+                if not cached:
+                    mtime = os.stat(image_path).st_mtime
+                    image, native_size = ImageUtils.load_display_image(image_path)
+                    self._put(image_path, mtime, image, native_size)
+                    with self._lock:
+                        self.prefetched += 1
+                if need_annotations:
+                    annotations = self.annotation_loader(image_path)
+                    with self._lock:
+                        self._annotations.setdefault(image_path, annotations)
+            except Exception:
+                # A broken file is reported when the user actually opens it
+                continue
+
+    def _put(self, image_path: str, mtime: float, image: Image.Image, native_size: Tuple[int, int]):
+        with self._lock:
+            old = self._images.pop(image_path, None)
+            if old is not None:
+                self._memory -= self._image_bytes(old[1])
+            self._images[image_path] = (mtime, image, native_size)
+            self._memory += self._image_bytes(image)
+            while self._memory > self.max_memory_bytes and len(self._images) > 1:
+                evicted_path, evicted = self._images.popitem(last=False)
+                self._memory -= self._image_bytes(evicted[1])
+                self._annotations.pop(evicted_path, None)
+
+    @staticmethod
+    def _image_bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
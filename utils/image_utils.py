@@ -0,0 +1,73 @@
+import os
+from pathlib import Path
+from typing import List, Tuple
+from PIL import Image
+from config import Config
+from utils.file_utils import FileUtils
+from utils.metrics import Metrics
+
+
+class ImageUtils:
+    @staticmethod
+    def get_image_size(image_path: str) -> Tuple[int, int]:
+        """Read (width, height) from the image header without decoding pixels"""
+        with Image.open(image_path) as img:
+            return img.size
+
+    @staticmethod
+    def get_pyramid_path(image_path: str, level: int) -> Path:
+        """Cached downscaled copy of an image whose longest side is `level`"""
+        return Config.PYRAMID_DIR / f"{Path(image_path).stem}_{level}.jpg"
+
+    @staticmethod
+    def build_pyramid(image_path: str, levels: List[int] = Config.PYRAMID_LEVELS) -> Tuple[int, int]:
+        """Decode an image once and write every pyramid level, largest first.
+
+        Levels not smaller than the image itself are skipped, the native file is
+        used for them. Returns the native (width, height).
+        """
+        with Image.open(image_path) as img:
+            native_size = img.size
+            # JPEG can decode straight at a reduced scale
+            img.draft("RGB", (max(levels), max(levels)))
+            level_img = img.convert("RGB")
+
+        for level in sorted(levels, reverse=True):
+            if level >= max(native_size):
+                continue
+            level_img.thumbnail((level, level), Image.LANCZOS, reducing_gap=2.0)
+            target = ImageUtils.get_pyramid_path(image_path, level)
+            # The prefetch thread and a cache miss in the UI may build the same level
+            with FileUtils.atomic_write(target, "wb") as f:
+                level_img.save(f, format="JPEG", quality=90)
+        return native_size
+
+    @staticmethod
+    @Metrics.timed("image.decode")
+    def load_display_image(image_path: str, max_size: int = Config.DISPLAY_MAX_SIZE) -> Tuple[Image.Image, Tuple[int, int]]:
+        """Return an RGB image no larger than `max_size` and the native (width, height)"""
+        native_size = ImageUtils.get_image_size(image_path)
+        if max(native_size) <= max_size:
+            with Image.open(image_path) as img:
+                return img.convert("RGB"), native_size
+
+        # Smallest pyramid level that still covers the requested size
+        level = min((l for l in Config.PYRAMID_LEVELS if l >= max_size), default=None)
+        if level is None or level >= max(native_size):
+            with Image.open(image_path) as img:
+                img.draft("RGB", (max_size, max_size))
+                display = img.convert("RGB")
+        else:
+            level_path = ImageUtils.get_pyramid_path(image_path, level)
+            if not level_path.exists() or level_path.stat().st_mtime < os.stat(image_path).st_mtime:
+                ImageUtils.build_pyramid(image_path)
+            with Image.open(level_path) as img:
+                display = img.convert("RGB")
+
+        display.thumbnail((max_size, max_size), Image.LANCZOS)
+        return display, native_size
+
+    @staticmethod
+    def delete_pyramid(image_path: str):
+        for level in Config.PYRAMID_LEVELS:
+            ImageUtils.get_pyramid_path(image_path, level).unlink(missing_ok=True)
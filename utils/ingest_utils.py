@@ -0,0 +1,145 @@
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+from PIL import Image
+from config import Config
+from utils.dataset_manifest import DatasetManifest
+from utils.file_utils import FileUtils
+from utils.phash_utils import PHashIndex, PHashUtils
+
+
+class IngestUtils:
+    # What to do with an upload whose perceptual hash is close to a stored image
+    NEAR_DUPLICATES_FLAG = "flag"  # store it and record which image it repeats
+    NEAR_DUPLICATES_SKIP = "skip"  # do not store it
+    NEAR_DUPLICATES_KEEP = "keep"  # store it unflagged (it is still hashed for later uploads)
+
+    @staticmethod
+    def hash_bytes(data) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    @staticmethod
+    def probe(uploaded_file) -> Tuple[str, Optional[Tuple[int, int]]]:
+        """Content hash and (width, height) from the header; size is None if not an image"""
+        data = uploaded_file.getbuffer()
+        content_hash = IngestUtils.hash_bytes(data)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                return content_hash, img.size
+        except Exception:
+            return content_hash, None
+
+    @staticmethod
+    def ingest(
+        uploaded_files,
+        manifest: DatasetManifest,
+        max_workers: int = Config.INGEST_WORKERS,
+        phash_index: Optional[PHashIndex] = None,
+        near_duplicates: str = NEAR_DUPLICATES_FLAG,
+        radius: int = Config.PHASH_RADIUS,
+    ) -> Tuple[List[str], List[str], List[str], List[Tuple[str, List[Tuple[int, str]]]]]:
+        """Store uploaded images, skipping content that is already in the dataset.
+
+        Hashing, probing and writing run on a thread pool. Files are written
+        to a temp name and renamed, and a name clash with different content
+        gets a hash suffix instead of overwriting. With a ``phash_index``,
+        uploads within ``radius`` bits of a stored image or of an earlier
+        file in the same batch are flagged or skipped. Returns (saved paths,
+        paths of already stored duplicates, names of invalid files,
+        (name, [(distance, matched name), ...]) per near-duplicate).
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            probes = list(pool.map(IngestUtils.probe, uploaded_files))
+
+        to_write = []
+        duplicates: List[str] = []
+        invalid: List[str] = []
+        batch_names = {}
+        for uploaded_file, (content_hash, size) in zip(uploaded_files, probes):
+            if size is None:
+                invalid.append(uploaded_file.name)
+                continue
+            existing = (
+                manifest.find_by_hash(content_hash)
+                or batch_names.get(content_hash)
+                or IngestUtils._unhashed_copy(uploaded_file, content_hash, manifest)
+            )
+            if existing is not None:
+                duplicates.append(manifest.get_path(existing))
+                continue
+            name = IngestUtils._free_name(uploaded_file.name, content_hash, manifest, batch_names.values())
+            batch_names[content_hash] = name
+            to_write.append((uploaded_file, name, content_hash, size))
+
+        near: List[Tuple[str, List[Tuple[int, str]]]] = []
+        phashes = []
+        if phash_index is not None:
+            to_write, phashes, near = IngestUtils._check_near_duplicates(
+                to_write, phash_index, near_duplicates, radius, max_workers
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            records = list(pool.map(lambda item: IngestUtils._write(manifest, *item), to_write))
+        manifest.add_many(records)
+        manifest.set_phashes(phashes)
+        return [manifest.get_path(r[0]) for r in records], duplicates, invalid, near
+
+    @staticmethod
+    def _check_near_duplicates(to_write: List[Tuple], phash_index: PHashIndex, mode: str, radius: int, max_workers: int):
+        """Split pending writes by perceptual hash; returns (to_write, phash rows, near-duplicates)"""
+        hashes = PHashUtils.hash_sources([item[0].getbuffer() for item in to_write], max_workers)
+        kept, phashes, near = [], [], []
+        for item, phash in zip(to_write, hashes):
+            name = item[1]
+            if phash is None:
+                kept.append(item)
+                continue
+            # Earlier files of this batch are already in the index: frame runs collapse too
+            matches = phash_index.search(phash, radius) if mode != IngestUtils.NEAR_DUPLICATES_KEEP else []
+            if matches:
+                if mode == IngestUtils.NEAR_DUPLICATES_SKIP:
+                    near.append((Path(item[0].name).name, matches))
+                    continue
+                near.append((name, matches))
+            phash_index.add(phash, name)
+            kept.append(item)
+            phashes.append((name, phash, matches[0][1] if matches else None))
+        return kept, phashes, near
+
+    @staticmethod
+    def _unhashed_copy(uploaded_file, content_hash: str, manifest: DatasetManifest) -> Optional[str]:
+        """Name of a same-named file on disk with this content that the manifest has no hash for"""
+        name = Path(uploaded_file.name).name
+        path = manifest.images_dir / name
+        if not path.exists() or path.stat().st_size != uploaded_file.size:
+            return None
+        record = manifest.get(name)
+        if record is not None and record["hash"] is not None:
+            return None
+        with open(path, "rb") as f:
+            if IngestUtils.hash_bytes(f.read()) != content_hash:
+                return None
+        stat = path.stat()
+        with Image.open(path) as img:
+            width, height = img.size
+        manifest.add_many([(name, stat.st_size, stat.st_mtime, width, height, content_hash)])
+        return name
+
+    @staticmethod
+    def _free_name(name: str, content_hash: str, manifest: DatasetManifest, taken) -> str:
+        name = Path(name).name
+        if manifest.get(name) is None and name not in taken and not (manifest.images_dir / name).exists():
+            return name
+        stem, suffix = Path(name).stem, Path(name).suffix
+        return f"{stem}_{content_hash[:8]}{suffix}"
+
+    @staticmethod
+    def _write(manifest: DatasetManifest, uploaded_file, name: str, content_hash: str, size: Tuple[int, int]):
+        target = manifest.images_dir / name
+        # Two sessions may upload the same file at once
+        with FileUtils.atomic_write(target, "wb") as f:
+            f.write(uploaded_file.getbuffer())
+        stat = target.stat()
+        return name, stat.st_size, stat.st_mtime, size[0], size[1], content_hash
@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from config import Config
+
+
+class Job:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    def __init__(self, job_id: str, total: int, skipped: int = 0):
+        self.job_id = job_id
+        self.total = total
+        self.done = skipped
+        self.skipped = skipped
+        self.failed: List[str] = []
+        self.status = Job.QUEUED
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (Job.QUEUED, Job.RUNNING)
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def throughput(self) -> float:
+        """Images processed per second in this run (checkpointed ones excluded)"""
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return (self.done - self.skipped) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        rate = self.throughput
+        if not rate or not self.is_active:
+            return None
+        return (self.total - self.done) / rate
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class JobRunner:
+    """Runs long jobs on a worker pool that outlives Streamlit script reruns.
+
+    A job handler receives the items still to process and yields an
+    ``(item, ok)`` pair once each item is finished. Finished items are appended to a checkpoint file,
+    so submitting the same job id again skips them.
+    """
+
+    def __init__(self, max_workers: int = Config.JOB_WORKERS, checkpoint_dir: Path = Config.JOBS_DIR):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.jobs: Dict[str, Job] = {}
+        self._submissions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        job_id: str,
+        items: List[str],
+        handler: Callable[[List[str], threading.Event], Iterable[Tuple[str, bool]]],
+        checkpoint: bool = True,
+    ) -> Job:
+        """Start (or resume) a job, returning the already active one if any"""
+        with self._lock:
+            current = self.jobs.get(job_id)
+            if current is not None and current.is_active:
+                return current
+
+            done = self._load_checkpoint(job_id) if checkpoint else set()
+            remaining = [item for item in items if item not in done]
+            job = Job(job_id, total=len(items), skipped=len(items) - len(remaining))
+            self.jobs[job_id] = job
+            self._submissions[job_id] = (items, handler, checkpoint)
+
+        self.executor.submit(self._run, job, remaining, handler, checkpoint)
+        return job
+
+    def resume(self, job_id: str) -> Optional[Job]:
+        """Resubmit a cancelled or failed job, skipping checkpointed items"""
+        submission = self._submissions.get(job_id)
+        if submission is None:
+            return None
+        items, handler, checkpoint = submission
+        return self.submit(job_id, items, handler, checkpoint)
+
+    def has_active_jobs(self) -> bool:
+        return any(job.is_active for job in list(self.jobs.values()))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def clear_checkpoint(self, job_id: str):
+        self._checkpoint_path(job_id).unlink(missing_ok=True)
+
+    def _run(self, job: Job, items: List[str], handler, checkpoint: bool):
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        results: Optional[Iterator[Tuple[str, bool]]] = None
+        checkpoint_file = open(self._checkpoint_path(job.job_id), "a") if checkpoint else None
+        try:
+            results = iter(handler(items, job.cancel_event))
+            for item, ok in results:
+                job.done += 1
+                if not ok:
+                    job.failed.append(item)
+                elif checkpoint_file is not None:
+                    # Failed items stay out of the checkpoint so Resume retries them
+                    checkpoint_file.write(f"{item}\n")
+                    checkpoint_file.flush()
+                if job.cancel_event.is_set():
+                    break
+            job.status = Job.CANCELLED if job.cancel_event.is_set() else Job.COMPLETED
+        except Exception as e:
+            job.status = Job.FAILED
+            job.error = str(e)
+        finally:
+            if hasattr(results, "close"):
+                results.close()
+            if checkpoint_file is not None:
+                checkpoint_file.close()
+            job.finished_at = time.time()
+
+        if job.status == Job.COMPLETED and checkpoint:
+            self.clear_checkpoint(job.job_id)
+
+    def _checkpoint_path(self, job_id: str) -> Path:
+        return self.checkpoint_dir / f"{job_id}.done"
+
+    def _load_checkpoint(self, job_id: str) -> Set[str]:
+        path = self._checkpoint_path(job_id)
+        if not path.exists():
+            return set()
+        with open(path, "r") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
@@ -0,0 +1,193 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional
+import numpy as np
+from config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    image_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_session_idx ON leases (session_id, expires_at);
+CREATE TABLE IF NOT EXISTS completed (
+    image_id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    completed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    image_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class VersionConflict(Exception):
+    """The label file changed since the editor loaded it"""
+
+    def __init__(self, image_id: str, expected: int, current: int):
+        super().__init__(f"{image_id} is at version {current}, edits were made on version {expected}")
+        self.image_id = image_id
+        self.expected = expected
+        self.current = current
+
+
+class LeaseStore:
+    """Work distribution between annotators sharing one dataset.
+
+    Each browser session leases a batch of images; a lease expires after
+    ``ttl`` seconds unless renewed, so abandoned batches return to the
+    pool. Images a session saved or moved past are completed and never
+    leased again, whatever their boxes are. Independently of leases,
+    every label file write bumps the image's version (``on_write`` is an
+    AnnotationUtils write listener) and ``checked_write`` refuses a save
+    made on an older version.
+    """
+
+    def __init__(self, db_path: Path = Config.LEASES_DB_PATH, annotations_dir: Path = Config.ANNOTATIONS_DIR):
+        self.db_path = Path(db_path)
+        self.annotations_dir = Path(annotations_dir).resolve()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # Serializes check-then-write of saves in this process; separate from
+        # _lock because the write itself calls back into on_write
+        self._write_lock = threading.Lock()
+
+    def leased(self, session_id: str, ttl: float = Config.LEASE_TTL) -> List[str]:
+        """Renew the session's unexpired leases and return them in the order they were taken"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE session_id = ? AND expires_at > ?",
+                (now + ttl, session_id, now),
+            )
+            rows = self._conn.execute(
+                "SELECT image_id FROM leases WHERE session_id = ? AND expires_at > ? ORDER BY acquired_at, rowid",
+                (session_id, now),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def acquire(
+        self,
+        session_id: str,
+        candidates: Iterable[str],
+        batch_size: int = Config.LEASE_BATCH_SIZE,
+        ttl: float = Config.LEASE_TTL,
+    ) -> List[str]:
+        """Top the session's batch up to ``batch_size`` from candidates nobody else holds.
+
+        The check and the insert run in one IMMEDIATE transaction, so two
+        sessions (or processes) can never lease the same image. Candidates
+        are consumed lazily, only as far as needed.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            held = dict(self._conn.execute("SELECT image_id, session_id FROM leases"))
+            completed = {r[0] for r in self._conn.execute("SELECT image_id FROM completed")}
+            own = sum(1 for holder in held.values() if holder == session_id)
+            new = []
+            for image_id in candidates:
+                if own + len(new) >= batch_size:
+                    break
+                if image_id not in held and image_id not in completed:
+                    held[image_id] = session_id
+                    new.append(image_id)
+            self._conn.executemany(
+                "INSERT INTO leases (image_id, session_id, acquired_at, expires_at) VALUES (?, ?, ?, ?)",
+                [(image_id, session_id, now, now + ttl) for image_id in new],
+            )
+        return self.leased(session_id, ttl)
+
+    def release(self, session_id: str, image_ids: Optional[Iterable[str]] = None):
+        """Give images (default: the whole batch) back to the pool"""
+        with self._lock, self._conn:
+            if image_ids is None:
+                self._conn.execute("DELETE FROM leases WHERE session_id = ?", (session_id,))
+            else:
+                self._conn.executemany(
+                    "DELETE FROM leases WHERE image_id = ? AND session_id = ?",
+                    [(image_id, session_id) for image_id in image_ids],
+                )
+
+    def complete(self, session_id: str, image_ids: Iterable[str], release: bool = True):
+        """Record images as done so no session leases them again; by default also give up their leases"""
+        image_ids = list(image_ids)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO completed (image_id, session_id, completed_at) VALUES (?, ?, ?)",
+                [(image_id, session_id, now) for image_id in image_ids],
+            )
+            if release:
+                self._conn.executemany(
+                    "DELETE FROM leases WHERE image_id = ? AND session_id = ?",
+                    [(image_id, session_id) for image_id in image_ids],
+                )
+
+    def forget(self, image_id: str):
+        """Drop every lease and completion record of a deleted image"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM leases WHERE image_id = ?", (image_id,))
+            self._conn.execute("DELETE FROM completed WHERE image_id = ?", (image_id,))
+
+    def holder(self, image_id: str) -> Optional[str]:
+        """Session holding an unexpired lease on the image, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id FROM leases WHERE image_id = ? AND expires_at > ?", (image_id, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def active_sessions(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(DISTINCT session_id) FROM leases WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def version(self, image_id: str) -> int:
+        """Number of writes to the image's label file so far (0 if never written)"""
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM versions WHERE image_id = ?", (image_id,)).fetchone()
+        return row[0] if row else 0
+
+    def on_write(self, annotation_path: str, boxes: Optional[np.ndarray]):
+        """Write listener: every write or delete of a dataset label file is a new version"""
+        path = Path(annotation_path)
+        if path.parent.resolve() != self.annotations_dir:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO versions (image_id, version, updated_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(image_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+                (path.stem, time.time()),
+            )
+
+    @contextmanager
+    def checked_write(self, image_id: str, expected: Optional[int]):
+        """Run a save only if the image is still at ``expected``; raises VersionConflict otherwise.
+
+        Saves from this process are serialized, so the check cannot go stale
+        before the write. Another process writing in between is only caught
+        by the next save.
+        """
+        with self._write_lock:
+            if expected is not None:
+                current = self.version(image_id)
+                if current != expected:
+                    raise VersionConflict(image_id, expected, current)
+            yield
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
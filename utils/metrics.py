@@ -0,0 +1,193 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from config import Config
+
+
+class Metrics:
+    """Process-wide timings, counters and gauges, plus a per-rerun breakdown.
+
+    ``timed`` / ``timer`` add the elapsed time of a call to a named series
+    (count, total, max). A Streamlit rerun calls ``begin_rerun`` and
+    ``end_rerun`` on its own thread; sections timed on that thread in
+    between also land in the rerun's breakdown, while work on background
+    job threads only feeds the process totals. Recording is one
+    ``perf_counter`` pair and a dict update under a lock.
+    """
+
+    _lock = threading.Lock()
+    _timings: Dict[str, List[float]] = {}  # name -> [count, total seconds, max seconds]
+    _counters: Dict[str, float] = {}
+    _gauges: Dict[str, float] = {}
+    _local = threading.local()
+    _last_rerun: Optional[Dict] = None
+    enabled = Config.METRICS_ENABLED
+
+    @staticmethod
+    def timed(name: str) -> Callable:
+        """Decorator: record every call of the function under ``name``"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not Metrics.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    Metrics.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    @contextmanager
+    def timer(name: str):
+        """Context manager form of ``timed`` for a block inside a function"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if Metrics.enabled:
+                Metrics.observe(name, time.perf_counter() - start)
+
+    @staticmethod
+    def observe(name: str, seconds: float):
+        with Metrics._lock:
+            series = Metrics._timings.get(name)
+            if series is None:
+                Metrics._timings[name] = [1, seconds, seconds]
+            else:
+                series[0] += 1
+                series[1] += seconds
+                series[2] = max(series[2], seconds)
+        rerun = getattr(Metrics._local, "rerun", None)
+        if rerun is not None:
+            section = rerun["sections"].setdefault(name, [0, 0.0])
+            section[0] += 1
+            section[1] += seconds
+
+    @staticmethod
+    def increment(name: str, amount: float = 1):
+        with Metrics._lock:
+            Metrics._counters[name] = Metrics._counters.get(name, 0) + amount
+
+    @staticmethod
+    def set_gauge(name: str, value: float):
+        with Metrics._lock:
+            Metrics._gauges[name] = float(value)
+
+    @staticmethod
+    def begin_rerun():
+        Metrics._local.rerun = {"started": time.time(), "start": time.perf_counter(), "sections": {}}
+
+    @staticmethod
+    def end_rerun() -> Optional[Dict]:
+        """Close the current rerun; returns its breakdown and records the total"""
+        rerun = getattr(Metrics._local, "rerun", None)
+        if rerun is None:
+            return None
+        Metrics._local.rerun = None
+        total = time.perf_counter() - rerun.pop("start")
+        Metrics.observe("rerun", total)
+        Metrics.set_gauge("memory_rss_bytes", Metrics.memory_rss())
+        rerun["total"] = total
+        with Metrics._lock:
+            Metrics._last_rerun = rerun
+        return rerun
+
+    @staticmethod
+    def last_rerun() -> Optional[Dict]:
+        with Metrics._lock:
+            return Metrics._last_rerun
+
+    @staticmethod
+    def snapshot() -> Dict:
+        with Metrics._lock:
+            return {
+                "timings": {
+                    name: {"count": int(count), "total": total, "max": peak}
+                    for name, (count, total, peak) in Metrics._timings.items()
+                },
+                "counters": dict(Metrics._counters),
+                "gauges": dict(Metrics._gauges),
+            }
+
+    @staticmethod
+    def reset():
+        with Metrics._lock:
+            Metrics._timings.clear()
+            Metrics._counters.clear()
+            Metrics._gauges.clear()
+            Metrics._last_rerun = None
+
+    @staticmethod
+    def memory_rss() -> int:
+        """Resident memory of this process in bytes (peak RSS where /proc is missing)"""
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            import resource
+
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+    @staticmethod
+    def to_prometheus(prefix: str = "annotator") -> str:
+        """Text exposition format: timings as summaries, counters and gauges as is"""
+        snapshot = Metrics.snapshot()
+        lines = [
+            f"# HELP {prefix}_section_seconds Wall time of instrumented sections",
+            f"# TYPE {prefix}_section_seconds summary",
+        ]
+        for name, series in sorted(snapshot["timings"].items()):
+            label = Metrics._label(name)
+            lines.append(f'{prefix}_section_seconds_count{{section="{label}"}} {series["count"]}')
+            lines.append(f'{prefix}_section_seconds_sum{{section="{label}"}} {series["total"]:.6f}')
+        lines.append(f"# TYPE {prefix}_section_seconds_max gauge")
+        for name, series in sorted(snapshot["timings"].items()):
+            lines.append(f'{prefix}_section_seconds_max{{section="{Metrics._label(name)}"}} {series["max"]:.6f}')
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{prefix}_{Metrics._metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        for name, value in sorted(snapshot["gauges"].items()):
+            metric = f"{prefix}_{Metrics._metric_name(name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def write_prometheus(path: Path = Config.METRICS_PROM_PATH):
+        """Atomically replace a node-exporter textfile-collector file"""
+        from utils.file_utils import FileUtils
+
+        # Every session's rerun writes this file
+        with FileUtils.atomic_write(path) as f:
+            f.write(Metrics.to_prometheus())
+
+    @staticmethod
+    def append_json_log(rerun: Dict, path: Path = Config.METRICS_JSON_LOG):
+        """One JSON line per rerun: its total, section breakdown and the process gauges"""
+        record = {
+            "time": rerun["started"],
+            "total": round(rerun["total"], 6),
+            "sections": {name: {"count": c, "seconds": round(s, 6)} for name, (c, s) in rerun["sections"].items()},
+            "gauges": Metrics.snapshot()["gauges"],
+        }
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    @staticmethod
+    def _metric_name(name: str) -> str:
+        return "".join(c if c.isalnum() else "_" for c in name)
+
+    @staticmethod
+    def _label(name: str) -> str:
+        return name.replace("\\", "\\\\").replace('"', '\\"')
@@ -1,7 +1,5 @@
 from typing import List, Optional
 from pathlib import Path
-import subprocess
-import requests
 import shutil
 import os
 from config import Config
@@ -10,6 +8,8 @@ class ModelUtils:
     @staticmethod
     def download_yolo_model(model_name: str) -> Optional[str]:
         """Download a YOLOv8 model from Ultralytics if not already exists"""
+        import requests
+
         model_path = Config.MODELS_DIR / f"{model_name}.pt"
         
         if not model_path.exists():
@@ -35,7 +35,7 @@ class ModelUtils:
         models = []
         for file in Config.MODELS_DIR.glob("*.pt"):
             models.append(file.stem)
-        return models
+        return sorted(models)
 
     @staticmethod
     def check_model_classes(model_path: str, target_classes: List[str]) -> bool:
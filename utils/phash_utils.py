@@ -0,0 +1,136 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Set, Tuple
+import numpy as np
+from PIL import Image
+from config import Config
+
+
+class PHashUtils:
+    """64-bit DCT perceptual hashes: near-identical frames differ in a few bits"""
+
+    SIZE = 32  # images are reduced to SIZE×SIZE grey before the DCT
+    _dct_matrix: Optional[np.ndarray] = None
+
+    @staticmethod
+    def dct_matrix() -> np.ndarray:
+        if PHashUtils._dct_matrix is None:
+            n = PHashUtils.SIZE
+            k = np.arange(n)[:, None]
+            matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+            matrix[0] /= np.sqrt(2.0)
+            PHashUtils._dct_matrix = matrix.astype(np.float32)
+        return PHashUtils._dct_matrix
+
+    @staticmethod
+    def load_gray(source) -> Optional[np.ndarray]:
+        """SIZE×SIZE float32 grey thumbnail from a path or bytes, None if unreadable"""
+        try:
+            with Image.open(io.BytesIO(source) if isinstance(source, (bytes, memoryview)) else source) as img:
+                # JPEG decodes straight to a reduced size, far cheaper than full resolution
+                img.draft("L", (PHashUtils.SIZE * 2, PHashUtils.SIZE * 2))
+                small = img.convert("L").resize((PHashUtils.SIZE, PHashUtils.SIZE), Image.BILINEAR)
+                return np.asarray(small, dtype=np.float32)
+        except Exception:
+            return None
+
+    @staticmethod
+    def hash_batch(gray: np.ndarray) -> np.ndarray:
+        """(B, SIZE, SIZE) thumbnails -> (B,) uint64 hashes, one batched DCT for all"""
+        dct = PHashUtils.dct_matrix()
+        coeffs = dct @ gray @ dct.T
+        low = coeffs[:, :8, :8].reshape(len(gray), 64)
+        # The DC term only encodes brightness; the median of the rest sets the bits
+        bits = low > np.median(low[:, 1:], axis=1)[:, None]
+        return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+    @staticmethod
+    def hash_sources(sources: List, max_workers: int = Config.INGEST_WORKERS) -> List[Optional[int]]:
+        """Hashes of image paths or bytes; None for unreadable ones"""
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            thumbs = list(pool.map(PHashUtils.load_gray, sources))
+        valid = [i for i, t in enumerate(thumbs) if t is not None]
+        hashes: List[Optional[int]] = [None] * len(sources)
+        if valid:
+            for i, h in zip(valid, PHashUtils.hash_batch(np.stack([thumbs[i] for i in valid])).tolist()):
+                hashes[i] = int(h)
+        return hashes
+
+    @staticmethod
+    def distance(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+    @staticmethod
+    def to_signed(phash: int) -> int:
+        """uint64 -> int64, the range SQLite INTEGER can hold"""
+        return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+    @staticmethod
+    def to_unsigned(value: int) -> int:
+        return value + (1 << 64) if value < 0 else value
+
+
+class PHashIndex:
+    """BK-tree over perceptual hashes for Hamming-radius queries.
+
+    Hamming distance is a metric, so a query of radius r only descends
+    into children whose edge distance is within r of the query's distance
+    to the node; a small radius touches a small part of the tree. Removed
+    images are filtered out of results rather than unlinked.
+    """
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash, names, {distance: child}]
+        self._alive: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._alive)
+
+    def add(self, phash: int, name: str):
+        with self._lock:
+            self._alive.add(name)
+            if self._root is None:
+                self._root = [phash, [name], {}]
+                return
+            node = self._root
+            while True:
+                d = PHashUtils.distance(phash, node[0])
+                if d == 0:
+                    node[1].append(name)
+                    return
+                child = node[2].get(d)
+                if child is None:
+                    node[2][d] = [phash, [name], {}]
+                    return
+                node = child
+
+    def add_many(self, items: Iterable[Tuple[int, str]]):
+        for phash, name in items:
+            self.add(phash, name)
+
+    def discard(self, name: str):
+        with self._lock:
+            self._alive.discard(name)
+
+    def search(self, phash: int, radius: int = Config.PHASH_RADIUS) -> List[Tuple[int, str]]:
+        """(distance, name) of every image within ``radius`` bits, nearest first"""
+        found = []
+        with self._lock:
+            stack = [self._root] if self._root is not None else []
+            while stack:
+                node = stack.pop()
+                d = PHashUtils.distance(phash, node[0])
+                if d <= radius:
+                    found.extend((d, name) for name in node[1] if name in self._alive)
+                for edge, child in node[2].items():
+                    if d - radius <= edge <= d + radius:
+                        stack.append(child)
+        return sorted(found)
+
+    @staticmethod
+    def build(records: Iterable[Tuple[str, int]]) -> "PHashIndex":
+        index = PHashIndex()
+        index.add_many((phash, name) for name, phash in records)
+        return index
@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    model_key TEXT NOT NULL,
+    image_id TEXT NOT NULL,
+    image_mtime REAL NOT NULL,
+    min_conf REAL NOT NULL,
+    boxes BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (model_key, image_id)
+);
+CREATE TABLE IF NOT EXISTS model_names (
+    model_key TEXT PRIMARY KEY,
+    names TEXT NOT NULL
+);
+"""
+
+
+class PredictionCache:
+    """Raw model output per (model, image), kept below any UI threshold.
+
+    Each entry is an (N, 6) float32 array of ``[model_class, confidence,
+    xc, yc, w, h]`` stored as one blob, with classes in the model's own ids
+    so the project class filter can change too. An entry is stale once the
+    image file changes, and incomplete for thresholds below its
+    ``min_conf``; both count as a miss.
+    """
+
+    COLUMNS = 6
+    QUERY_CHUNK = 500  # image ids per SELECT
+
+    def __init__(self, db_path: Path = Config.PREDICTIONS_DB_PATH):
+        self.db_path = Path(db_path)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def model_key(model_hash: str, tile_size: Optional[int] = None, tile_overlap: float = Config.TILE_OVERLAP) -> str:
+        """Cache namespace: the same weights give different boxes when tiled"""
+        if tile_size:
+            return f"{model_hash}|tiles:{tile_size}:{tile_overlap:.3f}"
+        return model_hash
+
+    def put(self, model_key: str, image_path: str, raw: np.ndarray, min_conf: float):
+        raw = np.ascontiguousarray(raw, dtype=np.float32).reshape(-1, self.COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?)",
+                (model_key, Path(image_path).stem, os.stat(image_path).st_mtime,
+                 float(min_conf), raw.tobytes(), time.time()),
+            )
+
+    def get(self, model_key: str, image_path: str, conf_threshold: float = 0.0) -> Optional[np.ndarray]:
+        """Cached raw predictions, or None on a miss"""
+        return self.get_many(model_key, [image_path], conf_threshold).get(image_path)
+
+    def get_many(self, model_key: str, image_paths: Iterable[str], conf_threshold: float = 0.0) -> Dict[str, np.ndarray]:
+        """Fresh entries usable at ``conf_threshold``, keyed by image path"""
+        paths = {Path(p).stem: p for p in image_paths}
+        image_ids = list(paths)
+        rows = []
+        with self._lock:
+            # Primary key lookups for just these images, in chunks below SQLite's variable limit
+            for start in range(0, len(image_ids), self.QUERY_CHUNK):
+                chunk = image_ids[start:start + self.QUERY_CHUNK]
+                rows.extend(self._conn.execute(
+                    "SELECT image_id, image_mtime, min_conf, boxes FROM predictions "
+                    f"WHERE model_key = ? AND image_id IN ({', '.join('?' * len(chunk))})",
+                    (model_key, *chunk),
+                ).fetchall())
+
+        hits = {}
+        for image_id, image_mtime, min_conf, blob in rows:
+            path = paths.get(image_id)
+            if path is None or min_conf > conf_threshold:
+                continue
+            try:
+                if os.stat(path).st_mtime != image_mtime:
+                    continue
+            except FileNotFoundError:
+                continue
+            hits[path] = np.frombuffer(blob, dtype=np.float32).reshape(-1, self.COLUMNS)
+        return hits
+
+    def entries_since(self, created_after: float = 0.0) -> List[Tuple[str, str, np.ndarray, float]]:
+        """(image_id, model_key, raw, created_at) of entries written after a timestamp"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT image_id, model_key, boxes, created_at FROM predictions "
+                "WHERE created_at > ? ORDER BY created_at",
+                (created_after,),
+            ).fetchall()
+        return [
+            (image_id, model_key, np.frombuffer(blob, dtype=np.float32).reshape(-1, self.COLUMNS), created_at)
+            for image_id, model_key, blob, created_at in rows
+        ]
+
+    def put_model_names(self, model_key: str, names: List[str]):
+        """Remember the model's class names, so cache hits need no loaded model"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO model_names VALUES (?, ?)", (model_key, json.dumps(list(names)))
+            )
+
+    def model_names(self, model_key: str) -> Optional[List[str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT names FROM model_names WHERE model_key = ?", (model_key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, model_key: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM predictions WHERE model_key = ?", (model_key,)
+            ).fetchone()[0]
+
+    def delete_image(self, image_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM predictions WHERE image_id = ?", (image_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
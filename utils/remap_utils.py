@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import Config
+from utils.annotation_utils import AnnotationUtils
+
+
+class RemapUtils:
+    @staticmethod
+    def build_mapping(
+        old_names: List[str],
+        new_names: List[str],
+        renames: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Dict[int, Optional[int]]:
+        """Old class id -> new class id (None deletes the class).
+
+        Classes are matched by name, so reordering is automatic. `renames`
+        maps an old name to a new one (several old names to one new name
+        merges them) or to None to delete it.
+        """
+        renames = renames or {}
+        new_ids = {name: idx for idx, name in enumerate(new_names)}
+        mapping = {}
+        for old_id, name in enumerate(old_names):
+            target = renames.get(name, name)
+            mapping[old_id] = new_ids.get(target) if target is not None else None
+        return mapping
+
+    @staticmethod
+    def build_lookup(mapping: Dict[int, Optional[int]]) -> np.ndarray:
+        """Dense lookup table; -1 deletes, ids missing from the mapping stay unchanged"""
+        size = max(mapping, default=-1) + 1
+        lookup = np.arange(size, dtype=np.int64)
+        for old_id, new_id in mapping.items():
+            lookup[old_id] = -1 if new_id is None else new_id
+        return lookup
+
+    @staticmethod
+    def apply_array(boxes: np.ndarray, lookup: np.ndarray) -> np.ndarray:
+        """Remap the class column of an (N, 5) array and drop deleted boxes"""
+        classes = boxes[:, 0].astype(np.int64)
+        known = classes < len(lookup)
+        new_classes = classes.copy()
+        new_classes[known] = lookup[classes[known]]
+        keep = new_classes >= 0
+        remapped = boxes[keep].copy()
+        remapped[:, 0] = new_classes[keep]
+        return remapped
+
+    @staticmethod
+    def remap_directory(
+        mapping: Dict[int, Optional[int]],
+        annotations_dir: Optional[Path] = None,
+        dry_run: bool = True,
+        max_workers: int = Config.REMAP_WORKERS,
+    ) -> Dict:
+        """Rewrite every label file through the mapping in one parallel pass.
+
+        Each changed file is replaced atomically. With dry_run nothing is
+        written and only the summary is computed. The summary holds file and
+        box counts, per-class counts before/after, and the new mtime of
+        every rewritten file keyed by image id.
+        """
+        annotations_dir = Path(annotations_dir or Config.ANNOTATIONS_DIR)
+        lookup = RemapUtils.build_lookup(mapping)
+        paths = [entry.path for entry in os.scandir(annotations_dir) if entry.name.endswith(".txt")]
+
+        def remap_file(path: str) -> Tuple[str, np.ndarray, np.ndarray, bool, Optional[float]]:
+            boxes = AnnotationUtils.read_yolo_array(path)
+            remapped = RemapUtils.apply_array(boxes, lookup)
+            changed = not np.array_equal(boxes, remapped)
+            new_mtime = None
+            if changed and not dry_run:
+                AnnotationUtils.write_yolo_array(path, remapped)
+                new_mtime = os.stat(path).st_mtime
+            return Path(path).stem, boxes[:, 0], remapped[:, 0], changed, new_mtime
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(remap_file, paths))
+
+        before = np.concatenate([r[1] for r in results]).astype(np.int64) if results else np.zeros(0, np.int64)
+        after = np.concatenate([r[2] for r in results]).astype(np.int64) if results else np.zeros(0, np.int64)
+        return {
+            "dry_run": dry_run,
+            "files_scanned": len(results),
+            "files_changed": sum(1 for r in results if r[3]),
+            "boxes_before": int(len(before)),
+            "boxes_deleted": int(len(before) - len(after)),
+            "class_counts_before": RemapUtils._counts(before),
+            "class_counts_after": RemapUtils._counts(after),
+            "mtimes": {r[0]: r[4] for r in results if r[4] is not None},
+        }
+
+    @staticmethod
+    def _counts(classes: np.ndarray) -> Dict[int, int]:
+        counts = np.bincount(classes) if len(classes) else np.zeros(0, np.int64)
+        return {idx: int(count) for idx, count in enumerate(counts) if count}
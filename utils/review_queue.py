@@ -0,0 +1,117 @@
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from config import Config
+from utils.annotation_store import AnnotationStore
+from utils.annotation_utils import AnnotationUtils
+from utils.prediction_cache import PredictionCache
+
+
+class ReviewQueue:
+    """Images ordered by how much a person's review would teach the model.
+
+    Scores come from cached raw predictions: the binary entropy of every
+    box confidence, plus disagreement when several models (or tiled and
+    whole-image runs of one model) predicted the same image. The queue is
+    a max-heap with lazy deletion: rescoring or removing an image is
+    O(log n) and stale heap entries are skipped when the top is read.
+    """
+
+    def __init__(self, disagreement_weight: float = Config.REVIEW_DISAGREEMENT_WEIGHT):
+        self.disagreement_weight = disagreement_weight
+        self._heap: List[Tuple[float, str]] = []
+        self._scores: Dict[str, float] = {}
+        self._predictions: Dict[str, Dict[str, np.ndarray]] = {}
+        self._reviewed: Set[str] = set()
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    @staticmethod
+    def entropy(raw: np.ndarray) -> float:
+        """Summed binary entropy (bits) of the box confidences"""
+        conf = np.clip(raw[:, 1].astype(np.float64), 1e-6, 1 - 1e-6)
+        return float(np.sum(-conf * np.log2(conf) - (1 - conf) * np.log2(1 - conf)))
+
+    @staticmethod
+    def disagreement(a: np.ndarray, b: np.ndarray) -> float:
+        """1 - mean best same-class IoU of each box with the other prediction set"""
+        if len(a) == 0 and len(b) == 0:
+            return 0.0
+        if len(a) == 0 or len(b) == 0:
+            return 1.0
+        iou = AnnotationUtils.same_class_iou(a[:, [0, 2, 3, 4, 5]], b[:, [0, 2, 3, 4, 5]])
+        matched = np.concatenate([iou.max(axis=1), iou.max(axis=0)])
+        return float(1.0 - matched.mean())
+
+    def score(self, predictions: Iterable[np.ndarray]) -> float:
+        predictions = list(predictions)
+        total = max(ReviewQueue.entropy(raw) for raw in predictions)
+        if len(predictions) > 1:
+            pairs = [
+                ReviewQueue.disagreement(predictions[i], predictions[j])
+                for i in range(len(predictions)) for j in range(i + 1, len(predictions))
+            ]
+            total += self.disagreement_weight * float(np.mean(pairs))
+        return total
+
+    def push(self, image_id: str, score: float):
+        """Insert or rescore an image unless it was already reviewed"""
+        with self._lock:
+            if image_id in self._reviewed:
+                return
+            self._scores[image_id] = score
+            heapq.heappush(self._heap, (-score, image_id))
+
+    def mark_reviewed(self, image_id: str):
+        with self._lock:
+            self._reviewed.add(image_id)
+            self._scores.pop(image_id, None)
+
+    def discard(self, image_id: str):
+        """Forget a deleted image entirely"""
+        with self._lock:
+            self._scores.pop(image_id, None)
+            self._predictions.pop(image_id, None)
+            self._reviewed.discard(image_id)
+
+    def peek(self, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Most informative unreviewed image and its score, skipping ``exclude``"""
+        with self._lock:
+            held = None
+            while self._heap:
+                neg_score, image_id = self._heap[0]
+                if self._scores.get(image_id) != -neg_score:
+                    heapq.heappop(self._heap)  # reviewed, deleted or rescored since pushed
+                    continue
+                if image_id == exclude:
+                    held = heapq.heappop(self._heap)
+                    continue
+                break
+            top = (self._heap[0][1], -self._heap[0][0]) if self._heap else None
+            if held is not None:
+                heapq.heappush(self._heap, held)
+            return top
+
+    def sync(self, cache: PredictionCache, store: AnnotationStore) -> int:
+        """Rescore images with predictions cached since the last sync; returns how many"""
+        if self._synced_at is None:
+            reviewed = store.reviewed_image_ids()
+            with self._lock:
+                self._reviewed |= reviewed
+        entries = cache.entries_since(self._synced_at or 0.0)
+        if not entries:
+            self._synced_at = self._synced_at or 0.0
+            return 0
+
+        changed = set()
+        for image_id, model_key, raw, created_at in entries:
+            self._predictions.setdefault(image_id, {})[model_key] = raw
+            changed.add(image_id)
+        for image_id in changed:
+            self.push(image_id, self.score(self._predictions[image_id].values()))
+        self._synced_at = entries[-1][3]
+        return len(changed)
@@ -0,0 +1,62 @@
+from typing import List
+import numpy as np
+
+
+class TilingUtils:
+    @staticmethod
+    def tile_windows(width: int, height: int, tile_size: int, overlap: float) -> np.ndarray:
+        """(N, 4) int array of overlapping (x1, y1, x2, y2) tiles covering the image"""
+        xs = TilingUtils._tile_starts(width, tile_size, overlap)
+        ys = TilingUtils._tile_starts(height, tile_size, overlap)
+        x1, y1 = np.meshgrid(xs, ys)
+        x1, y1 = x1.ravel(), y1.ravel()
+        return np.stack(
+            [x1, y1, np.minimum(x1 + tile_size, width), np.minimum(y1 + tile_size, height)], axis=1
+        )
+
+    @staticmethod
+    def _tile_starts(length: int, tile_size: int, overlap: float) -> np.ndarray:
+        if length <= tile_size:
+            return np.zeros(1, dtype=np.int64)
+        stride = max(1, int(tile_size * (1.0 - overlap)))
+        starts = np.arange(0, length - tile_size, stride, dtype=np.int64)
+        # The last tile is aligned to the far edge instead of running past it
+        return np.append(starts, length - tile_size)
+
+    @staticmethod
+    def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        """IoU of one (4,) xyxy box against (N, 4) boxes"""
+        ix1 = np.maximum(box[0], boxes[:, 0])
+        iy1 = np.maximum(box[1], boxes[:, 1])
+        ix2 = np.minimum(box[2], boxes[:, 2])
+        iy2 = np.minimum(box[3], boxes[:, 3])
+        inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+        area = (box[2] - box[0]) * (box[3] - box[1])
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        return inter / np.maximum(area + areas - inter, 1e-9)
+
+    @staticmethod
+    def nms(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, iou_threshold: float) -> np.ndarray:
+        """Class-aware greedy NMS; returns indices of kept boxes, best score first.
+
+        Boxes of different classes are shifted apart so a single pass never
+        suppresses across classes, and each kept box suppresses all of its
+        overlaps with one vectorized IoU row.
+        """
+        if len(boxes) == 0:
+            return np.zeros(0, dtype=np.int64)
+        boxes = np.asarray(boxes, dtype=np.float64)
+        offset = boxes.max() + 1.0
+        shifted = boxes + (np.asarray(class_ids, dtype=np.float64) * offset)[:, None]
+
+        order = np.argsort(-np.asarray(scores), kind="stable")
+        shifted = shifted[order]
+        suppressed = np.zeros(len(order), dtype=bool)
+        keep: List[int] = []
+        for i in range(len(order)):
+            if suppressed[i]:
+                continue
+            keep.append(i)
+            rest = slice(i + 1, None)
+            suppressed[rest] |= TilingUtils.box_iou(shifted[i], shifted[rest]) > iou_threshold
+        return order[np.asarray(keep, dtype=np.int64)]